@@ -0,0 +1,63 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import user_cache
+
+
+def check_user(user, validated_token):
+    # The same checks as JWTAuthentication.get_user, run for cached users too
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through the per-worker
+    user cache, loading it in one query on a miss.
+    ``aauthenticate`` does the same for the async views.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def user_lookup(self, user_id):
+        return self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+
+    def cache_user(self, user_id, user):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        user_cache.put(user_id, user)
+        return user
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = self.cache_user(user_id, self.user_lookup(user_id).first())
+        return check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = self.cache_user(user_id, await self.user_lookup(user_id).afirst())
+        return check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        # Signature and expiry checks need no database access
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
@@ -0,0 +1,39 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.provisioning import InvalidProvisionFile, provision_csv
+
+
+class Command(BaseCommand):
+    help = 'Create user accounts in bulk from a CSV file (username, email, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing passwords; 1 hashes in this process')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or (options['batch_size'] is not None and options['batch_size'] < 1):
+            raise CommandError('--workers and --batch-size must be at least 1.')
+
+        def progress(report):
+            self.stdout.write(f'{report.created + report.rejected} rows read, {report.created} created, '
+                              f'{report.rejected} rejected ({report.users_per_second} users/s)')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                report = provision_csv(f, batch_size=options['batch_size'], workers=options['workers'],
+                                       processes=True, progress=progress)
+        except (OSError, InvalidProvisionFile) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created} users in {report.seconds:.2f}s with {options["workers"]} workers '
+            f'({report.users_per_second} users/s).'
+        ))
+        if report.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {report.rejected} rows:'))
+            for reason, count in report.reasons.most_common():
+                self.stdout.write(f'  {reason}: {count}')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_month_spend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='closed_buckets_modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,12 +1,22 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
 
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    monthly_budget = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    monthly_budget = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every expense write; drives conditional GETs on the expense endpoints
+    expenses_modified_at = models.DateTimeField(null=True, blank=True)
+    # Bumped only by writes dated before today, which can change closed time series buckets
+    closed_buckets_modified_at = models.DateTimeField(null=True, blank=True)
+    # Spend dated in the month starting at month_start, maintained by apps.expenses.monthly_spend
+    month_start = models.DateField(null=True, blank=True)
+    month_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    month_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'user_profile'
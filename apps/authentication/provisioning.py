@@ -0,0 +1,209 @@
+"""
+Bulk account creation for onboarding many users at once.
+
+Rows are handled in batches. Each batch needs one IN query to find usernames
+that are already taken, then a bulk_create for the users and one for their
+profiles. Hashing the passwords is the slow part (each takes a full PBKDF2
+run), so large batches are hashed across a pool: threads by default, which
+hashlib lets run in parallel because it releases the GIL while hashing, or
+processes for the provision_users command.
+"""
+import csv
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import UserProfile
+
+REQUIRED_COLUMNS = {'username', 'email', 'password'}
+MAX_ERROR_SAMPLES = 20
+# Smaller batches are hashed in this process; starting the pool would cost more than it saves
+POOL_THRESHOLD = 64
+
+
+class InvalidProvisionFile(ValueError):
+    pass
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class ProvisionReport:
+    def __init__(self, position='row'):
+        self.position = position
+        self.created = 0
+        self.rejected = 0
+        self.reasons = Counter()
+        self.errors = []
+        self.users = []
+        self.started = time.monotonic()
+
+    def reject(self, position, reason):
+        self.rejected += 1
+        self.reasons[reason] += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append({self.position: position, 'error': reason})
+
+    @property
+    def seconds(self):
+        return time.monotonic() - self.started
+
+    @property
+    def users_per_second(self):
+        seconds = self.seconds
+        return round(self.created / seconds, 1) if seconds else 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'rejected': self.rejected,
+            'rejected_reasons': dict(self.reasons),
+            'errors': self.errors,
+            'users': self.users,
+            'seconds': round(self.seconds, 3),
+            'users_per_second': self.users_per_second,
+        }
+
+
+def parse_row(row):
+    if not isinstance(row, dict):
+        raise InvalidRow('expected an object')
+    username = str(row.get('username') or '').strip()
+    email = str(row.get('email') or '').strip()
+    password = row.get('password') or ''
+    try:
+        User._meta.get_field('username').clean(username, None)
+    except ValidationError:
+        raise InvalidRow('invalid username')
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise InvalidRow('invalid email')
+    if not isinstance(password, str) or not password:
+        raise InvalidRow('invalid password')
+    return username, email, password
+
+
+def init_worker():
+    # Forked workers already have Django loaded; spawned ones (macOS, Windows) need it set up
+    django.setup()
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    if pool is None or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    # A few chunks per worker keeps them all busy without a round trip per password
+    return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def taken_usernames(usernames):
+    return set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+
+def insert_batch(rows, report):
+    """
+    Insert ``rows`` of (position, User) with their profiles. If another writer
+    took one of the usernames since the check, the batch is retried once
+    without it; if that fails too, the batch's rows are rejected.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                created = User.objects.bulk_create([user for _, user in rows])
+                UserProfile.objects.bulk_create([UserProfile(user_id=user.pk) for user in created])
+            break
+        except IntegrityError:
+            if attempt:
+                for position, _ in rows:
+                    report.reject(position, 'could not be created')
+                return
+            taken = taken_usernames([user.username for _, user in rows])
+            for position, user in rows:
+                if user.username in taken:
+                    report.reject(position, 'username already exists')
+            rows = [(position, user) for position, user in rows if user.username not in taken]
+
+    report.created += len(created)
+    report.users.extend({'id': user.pk, 'username': user.username} for user in created)
+
+
+def provision(rows, batch_size=None, workers=1, processes=False, position='row', progress=None):
+    """
+    Create users from ``rows``, an iterable of (position, row) where each row
+    has username, email and password. Usernames that exist, or repeat an
+    earlier row, are rejected. Passwords are hashed by ``workers`` threads, or
+    processes with ``processes=True``. ``progress`` is called with the report
+    after each batch.
+    """
+    batch_size = batch_size or settings.USER_PROVISION_BATCH_SIZE
+    report = ProvisionReport(position)
+    seen = set()
+    rows = iter(rows)
+    if workers == 1:
+        pool = None
+    elif processes:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+
+            batch = []
+            for row_position, row in chunk:
+                try:
+                    username, email, password = parse_row(row)
+                except InvalidRow as e:
+                    report.reject(row_position, str(e))
+                    continue
+                if username in seen:
+                    report.reject(row_position, 'duplicate username')
+                    continue
+                seen.add(username)
+                batch.append((row_position, username, email, password))
+
+            taken = taken_usernames([username for _, username, _, _ in batch]) if batch else set()
+            fresh = []
+            for row_position, username, email, password in batch:
+                if username in taken:
+                    report.reject(row_position, 'username already exists')
+                else:
+                    fresh.append((row_position, username, email, password))
+
+            if fresh:
+                hashes = hash_passwords([password for *_, password in fresh], pool, workers)
+                insert_batch([
+                    (row_position, User(username=username, email=email, password=password_hash))
+                    for (row_position, username, email, _), password_hash in zip(fresh, hashes)
+                ], report)
+            if progress:
+                progress(report)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return report
+
+
+def provision_csv(text_file, batch_size=None, workers=1, processes=False, progress=None):
+    """Create users from an open CSV text stream with username, email and password columns."""
+    reader = csv.DictReader(text_file)
+    if reader.fieldnames is None:
+        raise InvalidProvisionFile('The file is empty.')
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = REQUIRED_COLUMNS.difference(reader.fieldnames)
+    if missing:
+        raise InvalidProvisionFile(f"Missing columns: {', '.join(sorted(missing))}")
+    return provision(enumerate(reader, start=1), batch_size=batch_size, workers=workers, processes=processes,
+                     progress=progress)
@@ -0,0 +1,151 @@
+"""
+Revocation of JWTs by ``jti``, checked without a database query.
+
+Revoked ids go into a SQLite file at TOKEN_REVOCATION_STORE_PATH, shared by
+every worker on the host, where each row gets an increasing sequence number.
+Every worker keeps the revoked ids in memory (jti -> expiry) and checks tokens
+against that dict. It reads the rows added since its last sync at most once
+every TOKEN_REVOCATION_SYNC_INTERVAL seconds. Revocations made by the worker
+itself apply immediately. A revoked id only needs to be kept until the token
+would have expired anyway, so expired entries are pruned from both the file and
+the dicts, and the store stays as small as the set of live revoked tokens.
+
+Refresh tokens are checked against the file itself instead, with one lookup
+on its jti index: a rotated token must stop working on every worker at once,
+not after their next sync.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+# Seconds between sweeps of expired ids out of a worker's dict
+PRUNE_INTERVAL = 60
+
+
+class SQLiteRevocationStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, opened again after a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # AUTOINCREMENT keeps sequence numbers increasing after pruned rows are deleted
+            connection.execute('CREATE TABLE IF NOT EXISTS revoked (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'jti TEXT NOT NULL UNIQUE, expires REAL NOT NULL)')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def add(self, jti, expires, now=None):
+        connection = self._connection()
+        connection.execute('DELETE FROM revoked WHERE expires <= ?', [time.time() if now is None else now])
+        connection.execute('INSERT OR IGNORE INTO revoked (jti, expires) VALUES (?, ?)', [jti, expires])
+
+    def contains(self, jti):
+        return self._connection().execute('SELECT 1 FROM revoked WHERE jti = ?', [jti]).fetchone() is not None
+
+    def since(self, seq):
+        """(seq, jti, expires) rows added after ``seq``, oldest first."""
+        return self._connection().execute(
+            'SELECT seq, jti, expires FROM revoked WHERE seq > ? ORDER BY seq', [seq]
+        ).fetchall()
+
+    def clear(self):
+        self._connection().execute('DELETE FROM revoked')
+
+
+class RevocationList:
+    """A worker's copy of the revoked ids, brought up to date from ``store``."""
+
+    def __init__(self, store, sync_interval):
+        self.store = store
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._seq = 0
+        self._synced_at = None
+        self._pruned_at = time.time()
+
+    def revoke(self, jti, expires):
+        self.store.add(jti, expires)
+        with self._lock:
+            self._revoked[jti] = expires
+
+    def is_revoked(self, jti):
+        now = time.monotonic()
+        if self._synced_at is None or now - self._synced_at >= self.sync_interval:
+            self.sync(now)
+        return jti in self._revoked
+
+    def sync(self, now=None):
+        with self._lock:
+            for seq, jti, expires in self.store.since(self._seq):
+                self._revoked[jti] = expires
+                self._seq = seq
+            self._synced_at = time.monotonic() if now is None else now
+            wall_time = time.time()
+            if wall_time - self._pruned_at >= PRUNE_INTERVAL:
+                self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > wall_time}
+                self._pruned_at = wall_time
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+_lists = {}
+_lists_lock = threading.Lock()
+
+
+def get_revocations():
+    path = settings.TOKEN_REVOCATION_STORE_PATH
+    with _lists_lock:
+        if path not in _lists:
+            _lists[path] = RevocationList(SQLiteRevocationStore(path), settings.TOKEN_REVOCATION_SYNC_INTERVAL)
+        return _lists[path]
+
+
+def revoke(token):
+    get_revocations().revoke(token[api_settings.JTI_CLAIM], token['exp'])
+
+
+def is_revoked(token, check_store=False):
+    # ``check_store`` skips this worker's copy, which may be up to a sync interval behind
+    revocations = get_revocations()
+    if check_store:
+        return revocations.store.contains(token[api_settings.JTI_CLAIM])
+    return revocations.is_revoked(token[api_settings.JTI_CLAIM])
+
+
+class RevocableTokenMixin:
+    check_store = False
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if is_revoked(self, check_store=self.check_store):
+            raise TokenError(_('Token is revoked'))
+
+
+class RevocableAccessToken(RevocableTokenMixin, AccessToken):
+    pass
+
+
+class RevocableRefreshToken(RevocableTokenMixin, RefreshToken):
+    """
+    Refresh rotation (with BLACKLIST_AFTER_ROTATION) calls ``blacklist()`` on
+    the token it replaces, which revokes it here instead of in simplejwt's
+    blacklist tables.
+    """
+    check_store = True
+
+    def blacklist(self):
+        revoke(self)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth.models import User
 from .models import UserProfile
+from .revocation import RevocableRefreshToken
 from django.db import IntegrityError
 
 
@@ -31,3 +33,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['monthly_budget']
+
+    def update(self, instance, validated_data):
+        # Save only the budget so the month figures written by concurrent expense writes are kept
+        instance.monthly_budget = validated_data.get('monthly_budget', instance.monthly_budget)
+        instance.save(update_fields=['monthly_budget', 'updated_at'])
+        return instance
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    # Rejects revoked refresh tokens, and revokes the old token when rotating
+    token_class = RevocableRefreshToken
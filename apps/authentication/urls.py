@@ -9,4 +9,5 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('protected/', views.protected_view, name='protected'),
     path('budget/', views.budget, name='budget'),
+    path('users/bulk/', views.bulk_provision_users, name='bulk_provision_users'),
 ]
@@ -0,0 +1,62 @@
+"""
+Per-worker LRU of authenticated users.
+
+Entries hold the User row alone (identity, password hash and is_active, which
+is what authentication checks), so a request whose user is cached spends no
+queries on identity. Profile columns such as the budget figures and the
+expense watermark change with every write and are read fresh by the views
+that use them. Saving or deleting a User evicts the entry in this worker;
+other workers notice within AUTH_USER_CACHE_TTL seconds. Lookups hand out
+copies, so nothing a request sets on its user leaks into other requests.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+_lock = threading.Lock()
+# str(user id) -> (user, loaded_at), least recently used first
+_entries = OrderedDict()
+
+
+def get(user_id):
+    # Ids are keyed as strings: token claims and primary keys may differ in type
+    key = str(user_id)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        user, loaded_at = entry
+        if time.monotonic() - loaded_at > settings.AUTH_USER_CACHE_TTL:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return copy.copy(user)
+
+
+def put(user_id, user):
+    key = str(user_id)
+    with _lock:
+        _entries[key] = (copy.copy(user), time.monotonic())
+        _entries.move_to_end(key)
+        while len(_entries) > settings.AUTH_USER_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def evict(user_id):
+    with _lock:
+        _entries.pop(str(user_id), None)
+
+
+def evict_on_commit(user_id):
+    # Drop now, and again once the change is visible to requests that reload the user
+    evict(user_id)
+    transaction.on_commit(lambda: evict(user_id))
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -1,13 +1,18 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 import logging
 from .serializers import UserRegistrationSerializer, UserProfileSerializer
+from . import provisioning, revocation
 from .models import UserProfile
+from .revocation import RevocableAccessToken, RevocableRefreshToken
+from apps.expenses import monthly_spend
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +35,21 @@ def register(request):
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_provision_users(request):
+    # Create many accounts at once; the body is a list of {username, email, password}
+    rows = request.data
+    if not isinstance(rows, list) or not rows:
+        return Response({'error': 'Expected a non-empty list of users.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > settings.USER_PROVISION_MAX_ROWS:
+        return Response({'error': f'At most {settings.USER_PROVISION_MAX_ROWS} users per request.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    report = provisioning.provision(enumerate(rows), workers=settings.USER_PROVISION_HASH_WORKERS, position='index')
+    return Response(report.as_dict(), status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -38,7 +58,7 @@ def login(request):
     password = request.data.get('password')
     user = authenticate(username=username, password=password)
     if user:
-        refresh = RefreshToken.for_user(user)
+        refresh = RevocableRefreshToken.for_user(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -48,7 +68,18 @@ def login(request):
 
 @api_view(['POST'])
 def logout(request):
-    # Simple logout (JWT tokens are stateless)
+    # Revoke the access token used for this request and, if given, the refresh token
+    raw_refresh = request.data.get('refresh')
+    if raw_refresh:
+        try:
+            refresh = RevocableRefreshToken(raw_refresh)
+        except TokenError:
+            return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
+        if str(refresh.get(jwt_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
+        revocation.revoke(refresh)
+    if isinstance(request.auth, RevocableAccessToken):
+        revocation.revoke(request.auth)
     return Response({'message': 'Logout successful'})
 
 
@@ -69,7 +100,14 @@ def budget(request):
         profile, created = UserProfile.objects.get_or_create(user=request.user)
         
         if request.method == 'GET':
-            return Response({'monthly_budget': profile.monthly_budget})
+            month = monthly_spend.read(request.user.id, profile.month_start, profile.month_spent, profile.month_count)
+            return Response({
+                'monthly_budget': profile.monthly_budget,
+                'month': f'{month.month:%Y-%m}',
+                'spent': month.spent,
+                'count': month.count,
+                'remaining': profile.monthly_budget - month.spent,
+            })
         
         elif request.method == 'PUT':
             serializer = UserProfileSerializer(profile, data=request.data)
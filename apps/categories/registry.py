@@ -0,0 +1,74 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Category
+
+# How often a lookup for an unknown id may force a reload
+MISS_RELOAD_INTERVAL = 1.0
+
+Snapshot = namedtuple('Snapshot', ['categories', 'serialized', 'version', 'loaded_at'])
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _load():
+    global _snapshot
+    from .serializers import CategorySerializer
+
+    categories = list(Category.objects.order_by('id'))
+    serialized = CategorySerializer(categories, many=True).data
+    version = hashlib.md5(repr([sorted(row.items()) for row in serialized]).encode()).hexdigest()
+    _snapshot = Snapshot({category.id: category for category in categories}, serialized, version, time.monotonic())
+    return _snapshot
+
+
+def _is_fresh(snapshot):
+    # The TTL bounds how long another worker's change can go unnoticed here
+    return snapshot is not None and time.monotonic() - snapshot.loaded_at <= settings.CATEGORY_CACHE_TTL
+
+
+def current():
+    snapshot = _snapshot
+    if _is_fresh(snapshot):
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        return snapshot if _is_fresh(snapshot) else _load()
+
+
+def categories_by_id():
+    return current().categories
+
+
+def get(pk):
+    snapshot = current()
+    if pk not in snapshot.categories and time.monotonic() - snapshot.loaded_at > MISS_RELOAD_INTERVAL:
+        # Possibly created by another worker since the last load
+        with _lock:
+            snapshot = _load()
+    return snapshot.categories.get(pk)
+
+
+def serialized():
+    return current().serialized
+
+
+def version():
+    return current().version
+
+
+def invalidate():
+    global _snapshot
+    _snapshot = None
+
+
+def invalidate_on_commit():
+    # Drop now, and again once the change is visible to other connections
+    invalidate()
+    transaction.on_commit(invalidate)
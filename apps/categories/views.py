@@ -1,22 +1,29 @@
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from . import registry
 from .models import Category
 from .serializers import CategorySerializer
 
 
+def catalogue_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+        return None
+    return registry.version()
+
+
 @api_view(['GET', 'POST'])
+@condition(etag_func=catalogue_etag)
 def get_categories(request):
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
     
     if request.method == 'GET':
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        return Response(registry.serialized())
     elif request.method == 'POST':
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
@@ -30,15 +37,19 @@ def category_detail(request, pk):
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
     
+    if request.method == 'GET':
+        category = registry.get(pk)
+        if category is None:
+            return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = CategorySerializer(category)
+        return Response(serializer.data)
+    
     try:
         category = Category.objects.get(pk=pk)
     except Category.DoesNotExist:
         return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
     
-    if request.method == 'GET':
-        serializer = CategorySerializer(category)
-        return Response(serializer.data)
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = CategorySerializer(category, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
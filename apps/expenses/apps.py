@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.expenses'
+
+    def ready(self):
+        import apps.expenses.signals
+        from django.db.models.signals import post_migrate
+        from .search import restore_triggers
+        post_migrate.connect(restore_triggers, sender=self)
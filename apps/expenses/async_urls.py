@@ -0,0 +1,12 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('', async_views.list_expenses, name='async_list_expenses'),
+    path('create/', async_views.create_expense, name='async_create_expense'),
+    path('bulk/', async_views.bulk_create_expenses, name='async_bulk_create_expenses'),
+    path('<int:pk>/update/', async_views.update_expense, name='async_update_expense'),
+    path('<int:pk>/delete/', async_views.delete_expense, name='async_delete_expense'),
+    path('summary/', async_views.summary, name='async_expense_summary'),
+    path('insights/', async_views.insights, name='async_spending_insights'),
+]
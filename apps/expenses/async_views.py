@@ -0,0 +1,158 @@
+"""
+Async versions of the expense endpoints, served under /api/async/expenses/.
+
+Reads go through Django's async ORM, so a slow query does not hold a worker
+while it waits. Writes call the same functions as the DRF views (apps.expenses.writes)
+in a worker thread, because transactions and the ``expenses_changed`` receivers
+are synchronous. Each view takes its methods and throttles from the DRF view it
+mirrors, and requests authenticate with the same JWT access tokens.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from apps.authentication.authentication import CachedJWTAuthentication
+
+from . import cache as expense_cache, monthly_spend, views, writes
+from .conditional import aprofile_state
+from .pagination import ExpensesCursorPagination, ExpensesPagination
+from .serializers import serialize_rows
+from .services import build_insights, insights_rows, streak_query, summarize, summary_rows
+
+renderer = JSONRenderer()
+jwt_authentication = CachedJWTAuthentication()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    if data is None:
+        return HttpResponse(status=status_code)
+    return HttpResponse(renderer.render(data), status=status_code, content_type='application/json')
+
+
+async def authenticate(request):
+    authenticated = await jwt_authentication.aauthenticate(request)
+    if authenticated is None:
+        raise NotAuthenticated()
+    return authenticated[0]
+
+
+def async_api_view(sync_view):
+    """The async counterpart of the ``@api_view`` function view ``sync_view``, which must require authentication."""
+    view_class = sync_view.cls
+    methods = {method.upper() for method in view_class.http_method_names} - {'OPTIONS'}
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response({'detail': f'Method "{request.method}" not allowed.'},
+                                     status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                request.user = await authenticate(request)
+                # The throttle store is a local SQLite file; keep its lock waits off the event loop
+                await sync_to_async(view_class().check_throttles, thread_sensitive=False)(request)
+                return await view(request, *args, **kwargs)
+            except APIException as e:
+                response = json_response({'detail': e.detail}, e.status_code)
+                if getattr(e, 'wait', None):
+                    response['Retry-After'] = str(int(e.wait))
+                return response
+        return csrf_exempt(wrapped)
+    return decorator
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'null')
+        except ValueError:
+            raise ParseError('JSON parse error')
+    return request.POST.dict()
+
+
+async def as_list(queryset):
+    return [row async for row in queryset]
+
+
+async def _list_expenses_data(request):
+    # views._list_expenses_data with the async ORM
+    filtered = views.filtered_expenses(request)
+    drf_request = Request(request)
+
+    if views.use_cursor_pagination(request):
+        paginator = ExpensesCursorPagination()
+        page = paginator.finish_page(await as_list(paginator.page_queryset(filtered, drf_request)))
+        return paginator.get_paginated_response(serialize_rows(page)).data
+
+    count = await filtered.acount()
+    if not count:
+        return {'message': 'No expenses found.'}
+
+    paginator = ExpensesPagination()
+    page = await as_list(paginator.page_queryset(filtered, drf_request, count))
+    return paginator.get_paginated_response(serialize_rows(page)).data
+
+
+@async_api_view(views.list_expenses)
+async def list_expenses(request):
+    if not views.is_first_page(request):
+        return json_response(await _list_expenses_data(request))
+    # Cached apart from the DRF list because the pagination links point at this URL
+    return json_response(await expense_cache.aget_or_compute(request, 'async-list', lambda: _list_expenses_data(request)))
+
+
+@async_api_view(views.create_expense)
+async def create_expense(request):
+    payload, code = await sync_to_async(writes.create)(request.user, request_data(request))
+    return json_response(payload, code)
+
+
+@async_api_view(views.bulk_create_expenses)
+async def bulk_create_expenses(request):
+    payload, code = await sync_to_async(writes.bulk_create)(request.user, request_data(request))
+    return json_response(payload, code)
+
+
+@async_api_view(views.update_expense)
+async def update_expense(request, pk):
+    payload, code = await sync_to_async(writes.update)(request.user, pk, request_data(request))
+    return json_response(payload, code)
+
+
+@async_api_view(views.delete_expense)
+async def delete_expense(request, pk):
+    payload, code = await sync_to_async(writes.delete)(request.user, pk)
+    return json_response(payload, code)
+
+
+@async_api_view(views.summary)
+async def summary(request):
+    async def compute():
+        # Runs one query after the other: the profile row is already loaded for the cache key,
+        # and the async ORM serializes queries on the request's single connection anyway
+        rows = await as_list(summary_rows(request.user, request.GET))
+        state = await aprofile_state(request)
+        if state.month_start == monthly_spend.current_month():
+            month_spent = state.month_spent
+        else:
+            # A month rollover writes to the profile, so it runs synchronously
+            month = await sync_to_async(monthly_spend.read)(
+                request.user.id, state.month_start, state.month_spent, state.month_count
+            )
+            month_spent = month.spent
+        return summarize(rows, state.monthly_budget, request.GET, month_spent)
+    return json_response(await expense_cache.aget_or_compute(request, 'summary', compute))
+
+
+@async_api_view(views.insights)
+async def insights(request):
+    async def compute():
+        return build_insights(await as_list(insights_rows(request.user)), await streak_query(request.user).afirst())
+    return json_response(await expense_cache.aget_or_compute(request, 'insights', compute))
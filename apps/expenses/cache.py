@@ -0,0 +1,57 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .conditional import aprofile_state, profile_state
+from .filters import normalize_params
+
+# Hit/miss counters for this process
+stats = {'hits': 0, 'misses': 0}
+
+
+def cache_key(user_id, endpoint, params, version):
+    # ``version`` is the profile's expense watermark, which every worker reads from the
+    # database, so a write on one worker changes the key on all of them. Results also
+    # depend on today's date through the period filters and month figures.
+    raw = repr((timezone.localdate().isoformat(), version and version.isoformat(), normalize_params(params)))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'expenses:{endpoint}:{user_id}:{digest}'
+
+
+def get_or_compute(request, endpoint, compute):
+    key = cache_key(request.user.id, endpoint, request.GET, profile_state(request).last_modified)
+    result = cache.get(key)
+    if result is not None:
+        stats['hits'] += 1
+        return result
+
+    stats['misses'] += 1
+    result = compute()
+    cache.set(key, result, settings.EXPENSE_CACHE_TIMEOUT)
+    return result
+
+
+async def aget_or_compute(request, endpoint, compute):
+    # ``compute`` is a coroutine function
+    key = cache_key(request.user.id, endpoint, request.GET, (await aprofile_state(request)).last_modified)
+    result = await cache.aget(key)
+    if result is not None:
+        stats['hits'] += 1
+        return result
+
+    stats['misses'] += 1
+    result = await compute()
+    await cache.aset(key, result, settings.EXPENSE_CACHE_TIMEOUT)
+    return result
+
+
+def get_stats():
+    lookups = stats['hits'] + stats['misses']
+    return {
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else 0,
+        'max_entries': settings.CACHES['default'].get('OPTIONS', {}).get('MAX_ENTRIES'),
+    }
@@ -0,0 +1,60 @@
+import hashlib
+from collections import namedtuple
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from apps.authentication.models import UserProfile
+from .filters import normalize_params
+
+# UserProfile columns behind a ProfileState
+PROFILE_FIELDS = (
+    'expenses_modified_at', 'updated_at', 'closed_buckets_modified_at',
+    'monthly_budget', 'month_start', 'month_spent', 'month_count',
+)
+ProfileState = namedtuple('ProfileState', [
+    'last_modified', 'closed_buckets_modified_at', 'monthly_budget', 'month_start', 'month_spent', 'month_count',
+])
+
+
+def _profile_rows(user):
+    return UserProfile.objects.filter(user=user).values_list(*PROFILE_FIELDS)
+
+
+def _state(row):
+    if row is None:
+        return ProfileState(None, None, 0, None, 0, 0)
+    expenses_modified_at, updated_at, closed_buckets_modified_at, *budget = row
+    last_modified = max(filter(None, [expenses_modified_at, updated_at]))
+    # Results also depend on today's date, so a new day is a new version
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return ProfileState(max(last_modified, start_of_day), closed_buckets_modified_at, *budget)
+
+
+def profile_state(request):
+    # One lookup per request for the expense watermarks and the budget figures the summary needs
+    if not hasattr(request, '_expense_profile_state'):
+        request._expense_profile_state = _state(_profile_rows(request.user).first())
+    return request._expense_profile_state
+
+
+async def aprofile_state(request):
+    if not hasattr(request, '_expense_profile_state'):
+        request._expense_profile_state = _state(await _profile_rows(request.user).afirst())
+    return request._expense_profile_state
+
+
+def expense_last_modified(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return profile_state(request).last_modified
+
+
+def expense_etag(endpoint):
+    def etag(request, *args, **kwargs):
+        last_modified = expense_last_modified(request)
+        if last_modified is None:
+            return None
+        raw = repr((endpoint, request.user.id, last_modified.isoformat(), normalize_params(request.GET)))
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
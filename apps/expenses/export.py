@@ -0,0 +1,38 @@
+import csv
+import json
+
+EXPORT_FIELDS = ['id', 'date', 'amount', 'category', 'description', 'tags', 'timestamp']
+EXPORT_COLUMNS = ['id', 'date', 'amount', 'category__name', 'description', 'tags', 'timestamp']
+
+
+class Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    return queryset.order_by('date', 'id').values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def _row_values(row):
+    expense_id, date, amount, category, description, tags, timestamp = row
+    return [expense_id, date.isoformat(), str(amount), category, description, tags, timestamp.isoformat()]
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(_row_values(row))
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, _row_values(row)))) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+}
@@ -1,7 +1,24 @@
 import django_filters
 from django.utils import timezone
 from datetime import timedelta
+from django.db.models import F
 from .models import Expenses
+from .search import search
+from .tags import parse_tags
+
+
+PERIOD_DAYS = {
+    'weekly': 7,
+    'monthly': 30,
+    'last_3_months': 90,
+}
+
+
+def period_start(value):
+    days = PERIOD_DAYS.get(value)
+    if days is None:
+        return None
+    return timezone.now().date() - timedelta(days=days)
 
 
 class ExpenseFilter(django_filters.FilterSet):
@@ -25,18 +42,21 @@ class ExpenseFilter(django_filters.FilterSet):
     date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
     date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
     
+    # Full-text search over descriptions, best matches first
+    search = django_filters.CharFilter(method='filter_by_search')
+    
     class Meta:
         model = Expenses
-        fields = ['category', 'period', 'tags', 'date_from', 'date_to']
+        fields = ['category', 'period', 'tags', 'date_from', 'date_to', 'search']
+    
+    def __init__(self, *args, user=None, **kwargs):
+        # ``user`` is the owner the queryset is limited to; search uses it to narrow the index lookup
+        super().__init__(*args, **kwargs)
+        self.user = user
     
     def filter_by_period(self, queryset, name, value):
-        if value == 'weekly':
-            start_date = timezone.now().date() - timedelta(days=7)
-        elif value == 'monthly':
-            start_date = timezone.now().date() - timedelta(days=30)
-        elif value == 'last_3_months':
-            start_date = timezone.now().date() - timedelta(days=90)
-        else:
+        start_date = period_start(value)
+        if start_date is None:
             return queryset
         
         return queryset.filter(date__gte=start_date)
@@ -45,9 +65,44 @@ class ExpenseFilter(django_filters.FilterSet):
         if not value:
             return queryset
         
-        # Split tags by comma and filter
-        tags = [tag.strip() for tag in value.split(',')]
-        for tag in tags:
-            queryset = queryset.filter(tags__icontains=tag)
+        # One join through the (user, tag) index per requested tag; all must match
+        for tag in parse_tags(value):
+            queryset = queryset.filter(expense_tags__user=F('user'), expense_tags__tag__name=tag)
+        
+        return queryset
+    
+    def filter_by_search(self, queryset, name, value):
+        return search(queryset, value, user_id=self.user.id if self.user is not None else None)
+    
+    def filter_rollups(self, queryset):
+        # Apply the same filters to a DailyRollup queryset, or return None when
+        # the rollup can't answer them (tags and descriptions are not part of the rollup key)
+        self.is_valid()  # populates cleaned_data; invalid values are ignored like in .qs
+        data = self.form.cleaned_data
+        if data.get('tags') or data.get('search'):
+            return None
         
-        return queryset
\ No newline at end of file
+        start_date = period_start(data.get('period'))
+        if start_date is not None:
+            queryset = queryset.filter(day__gte=start_date)
+        if data.get('category') is not None:
+            queryset = queryset.filter(category_id=data['category'])
+        if data.get('date_from'):
+            queryset = queryset.filter(day__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(day__lte=data['date_to'])
+        
+        return queryset
+
+
+# Query parameters that change the result of a cached or conditional endpoint
+CACHE_PARAMS = set(ExpenseFilter.base_filters) | {'page', 'page_size', 'pagination', 'cursor'}
+
+
+def normalize_params(params):
+    normalized = []
+    for key in sorted(CACHE_PARAMS.intersection(params.keys())):
+        values = sorted(value.strip() for value in params.getlist(key) if value.strip())
+        if values:
+            normalized.append((key, values))
+    return normalized
@@ -0,0 +1,148 @@
+import csv
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.categories import registry
+from .models import Expenses
+from .signals import expenses_changed
+
+REQUIRED_COLUMNS = {'date', 'amount', 'description', 'category'}
+MAX_AMOUNT = Decimal('99999999.99')
+MAX_ERROR_SAMPLES = 20
+
+
+class InvalidImportFile(ValueError):
+    pass
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.reasons = Counter()
+        self.errors = []
+        self.started = time.monotonic()
+
+    def reject(self, row_number, reason):
+        self.rejected += 1
+        self.reasons[reason] += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append({'row': row_number, 'error': reason})
+
+    @property
+    def seconds(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        seconds = self.seconds
+        return round((self.created + self.rejected) / seconds, 1) if seconds else 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'rejected': self.rejected,
+            'rejected_reasons': dict(self.reasons),
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+def category_lookup():
+    # Match category names case-insensitively; ids are accepted too
+    lookup = {}
+    for category_id, category in registry.categories_by_id().items():
+        lookup.setdefault(category.name.strip().lower(), category_id)
+        lookup[str(category_id)] = category_id
+    return lookup
+
+
+def parse_row(row, categories, date_format, today):
+    try:
+        date = datetime.strptime((row.get('date') or '').strip(), date_format).date()
+    except ValueError:
+        raise InvalidRow('invalid date')
+    if date > today:
+        raise InvalidRow('future date')
+
+    try:
+        amount = Decimal((row.get('amount') or '').strip().replace(',', '')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise InvalidRow('invalid amount')
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise InvalidRow('invalid amount')
+
+    description = (row.get('description') or '').strip()
+    if not description:
+        raise InvalidRow('missing description')
+
+    category_id = categories.get((row.get('category') or '').strip().lower())
+    if category_id is None:
+        raise InvalidRow('unknown category')
+
+    tags = (row.get('tags') or '').strip()
+    if len(tags) > Expenses._meta.get_field('tags').max_length:
+        raise InvalidRow('tags too long')
+
+    return date, amount, description, category_id, tags
+
+
+def import_csv(user, text_file, date_format='%Y-%m-%d', batch_size=None, progress=None):
+    """
+    Read expenses for ``user`` from an open CSV text stream, row by row.
+
+    Columns (header names are case-insensitive): date, amount, description,
+    category (name or id) and an optional tags column. Dates are kept as given,
+    except that future dates are rejected.
+    Valid rows are inserted with bulk_create, one transaction per batch, and
+    ``progress`` is called with the report after each batch.
+    """
+    batch_size = batch_size or settings.EXPENSE_BULK_BATCH_SIZE
+    report = ImportReport()
+    reader = csv.DictReader(text_file)
+    if reader.fieldnames is None:
+        raise InvalidImportFile('The file is empty.')
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = REQUIRED_COLUMNS.difference(reader.fieldnames)
+    if missing:
+        raise InvalidImportFile(f"Missing columns: {', '.join(sorted(missing))}")
+
+    categories = category_lookup()
+    rows = enumerate(reader, start=1)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        today = timezone.localdate()
+        for row_number, row in chunk:
+            try:
+                date, amount, description, category_id, tags = parse_row(row, categories, date_format, today)
+            except InvalidRow as e:
+                report.reject(row_number, str(e))
+                continue
+            batch.append(Expenses(user=user, date=date, amount=amount, description=description,
+                                  category_id=category_id, tags=tags))
+
+        if batch:
+            with transaction.atomic():
+                created = Expenses.objects.bulk_create(batch)
+                expenses_changed.send(sender=Expenses, user_id=user.id, added=created, created=True)
+            report.created += len(created)
+        if progress:
+            progress(report)
+
+    return report
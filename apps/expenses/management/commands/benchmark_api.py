@@ -0,0 +1,288 @@
+import json
+import random
+import subprocess
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.authentication import urls as authentication_urls
+from apps.authentication.models import UserProfile
+from apps.categories import urls as categories_urls
+from apps.categories.models import Category
+from apps.expenses import urls as expenses_urls
+from apps.expenses.models import Expenses
+from apps.expenses.signals import expenses_changed
+
+URL_MODULES = [expenses_urls, categories_urls, authentication_urls]
+PASSWORD = 'benchmark-pass-123'
+TAGS = ['work', 'family', 'travel', 'food', 'rent', 'health']
+# Requested as the staff user (the first seeded user)
+ADMIN_ENDPOINTS = {'expense_cache_stats', 'bulk_provision_users'}
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Seed deterministic users and expenses, drive every expense, category and auth endpoint '
+            'in-process, and report latency percentiles, requests/sec and queries per request as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--expenses-per-user', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--with-throttling', action='store_true',
+                            help='Keep the DRF throttles enabled (they will start returning 429s)')
+        parser.add_argument('--use-existing-db', action='store_true',
+                            help='Seed into the configured database instead of a throwaway test database')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['requests'] < 1:
+            raise CommandError('--users and --requests must be at least 1.')
+
+        old_name = None
+        if not options['use_existing_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        views = [] if options['with_throttling'] else self.disable_throttling()
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                report = self.run(options)
+        finally:
+            for view, throttle_classes in views:
+                view.cls.throttle_classes = throttle_classes
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def url_patterns(self):
+        return [pattern for module in URL_MODULES for pattern in module.urlpatterns if isinstance(pattern, URLPattern)]
+
+    def disable_throttling(self):
+        # The per-user rates would turn most of a benchmark run into 429s
+        views = []
+        for pattern in self.url_patterns():
+            view = pattern.callback
+            if hasattr(view, 'cls'):
+                views.append((view, view.cls.throttle_classes))
+                view.cls.throttle_classes = []
+        return views
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        categories = list(Category.objects.order_by('id').values_list('id', flat=True))
+        if not categories:
+            raise CommandError('No categories found; run migrations first.')
+
+        password = make_password(PASSWORD)
+        run_id = f"{options['seed']}-{int(time.time())}"
+        users = User.objects.bulk_create([
+            User(username=f'bench-{run_id}-{i}', password=password, is_staff=(i == 0))
+            for i in range(options['users'])
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user, monthly_budget=Decimal('1500.00')) for user in users])
+
+        today = timezone.localdate()
+        for user in users:
+            expenses = Expenses.objects.bulk_create([
+                Expenses(
+                    user=user,
+                    amount=Decimal(rng.randint(100, 50000)) / 100,
+                    description=f'Benchmark expense {i}',
+                    category_id=categories[i % len(categories)],
+                    tags=','.join(rng.sample(TAGS, rng.randint(0, 2))),
+                    date=today - timedelta(days=rng.randint(0, 730)),
+                )
+                for i in range(options['expenses_per_user'])
+            ], batch_size=settings.EXPENSE_BULK_BATCH_SIZE)
+            expenses_changed.send(sender=Expenses, user_id=user.id, added=expenses, created=True)
+        return users, categories
+
+    def run(self, options):
+        started = time.perf_counter()
+        users, categories = self.seed(options)
+        seed_seconds = time.perf_counter() - started
+
+        client = Client()
+        tokens = {user.id: RefreshToken.for_user(user) for user in users}
+        state = {
+            'refresh': {user.id: str(tokens[user.id]) for user in users},
+            'expense_ids': {
+                user.id: list(Expenses.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+                for user in users
+            },
+            'categories': categories,
+        }
+        specs = self.request_specs()
+
+        endpoints = {}
+        for pattern in self.url_patterns():
+            name = pattern.name
+            if name not in specs:
+                endpoints[name] = {'skipped': 'no request spec defined'}
+                continue
+            timings, queries, statuses, sizes = [], [], {}, []
+            for i in range(options['requests']):
+                user = users[0] if name in ADMIN_ENDPOINTS else users[i % len(users)]
+                request = specs[name](i, user, state)
+                headers = {}
+                if request.get('auth', True):
+                    access = request.get('access') or str(tokens[user.id].access_token)
+                    headers['HTTP_AUTHORIZATION'] = f'Bearer {access}'
+
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    response = getattr(client, request['method'])(
+                        request['path'], request.get('data'), secure=True,
+                        **({'content_type': 'application/json'} if request.get('json') else {}), **headers
+                    )
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    timings.append(time.perf_counter() - request_started)
+                queries.append(len(captured))
+                sizes.append(len(body))
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if 'after' in request:
+                    request['after'](response, user, state)
+
+            timings.sort()
+            endpoints[name] = {
+                'requests': len(timings),
+                'p50_ms': round(percentile(timings, 50) * 1000, 3),
+                'p95_ms': round(percentile(timings, 95) * 1000, 3),
+                'p99_ms': round(percentile(timings, 99) * 1000, 3),
+                'requests_per_second': round(len(timings) / sum(timings), 1),
+                'queries_per_request': round(sum(queries) / len(queries), 2),
+                'max_queries': max(queries),
+                'avg_response_bytes': round(sum(sizes) / len(sizes)),
+                'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            }
+
+        return {
+            'commit': self.git_commit(),
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'users': options['users'],
+            'expenses_per_user': options['expenses_per_user'],
+            'requests_per_endpoint': options['requests'],
+            'seed': options['seed'],
+            'seed_seconds': round(seed_seconds, 3),
+            'endpoints': endpoints,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                  cwd=settings.BASE_DIR).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def request_specs(self):
+        # url name -> function(iteration, user, state) returning the request to send
+        def expense_data(i, state):
+            return {
+                'amount': f'{(i % 90) + 10}.50',
+                'description': f'Benchmark write {i}',
+                'category': state['categories'][i % len(state['categories'])],
+                'tags': TAGS[i % len(TAGS)],
+            }
+
+        def keep_refresh(response, user, state):
+            if response.status_code == 200:
+                state['refresh'][user.id] = response.json().get('refresh', state['refresh'][user.id])
+
+        def import_file(i):
+            rows = ['date,amount,description,category,tags'] + [
+                f'2024-01-{day:02d},{day}.25,Imported {i}-{day},Groceries,import' for day in range(1, 21)
+            ]
+            return SimpleUploadedFile('benchmark.csv', '\n'.join(rows).encode(), content_type='text/csv')
+
+        def fresh_access(user):
+            # Logout may revoke the token it is called with, so give it its own pair
+            return str(RefreshToken.for_user(user).access_token)
+
+        return {
+            'list_expenses': lambda i, user, state: {'method': 'get', 'path': reverse('list_expenses'),
+                                                     'data': {'page_size': 20, 'period': 'last_3_months'}},
+            'create_expense': lambda i, user, state: {'method': 'post', 'path': reverse('create_expense'),
+                                                      'data': json.dumps(expense_data(i, state)), 'json': True},
+            'bulk_create_expenses': lambda i, user, state: {
+                'method': 'post', 'path': reverse('bulk_create_expenses'), 'json': True,
+                'data': json.dumps([expense_data(i * 10 + n, state) for n in range(10)]),
+            },
+            'export_expenses': lambda i, user, state: {'method': 'get', 'path': reverse('export_expenses'),
+                                                       'data': {'period': 'monthly'}},
+            'import_expenses': lambda i, user, state: {'method': 'post', 'path': reverse('import_expenses'),
+                                                       'data': {'file': import_file(i)}},
+            'update_expense': lambda i, user, state: {
+                'method': 'put', 'json': True,
+                'path': reverse('update_expense', args=[state['expense_ids'][user.id][i % len(state['expense_ids'][user.id])]]),
+                'data': json.dumps(expense_data(i, state)),
+            },
+            'delete_expense': lambda i, user, state: {
+                'method': 'delete', 'path': reverse('delete_expense', args=[state['expense_ids'][user.id].pop()]),
+            },
+            'expense_summary': lambda i, user, state: {
+                'method': 'get', 'path': reverse('expense_summary'),
+                'data': [{}, {'period': 'monthly'}, {'tags': 'work'}][i % 3],
+            },
+            'spending_insights': lambda i, user, state: {'method': 'get', 'path': reverse('spending_insights')},
+            'expense_timeseries': lambda i, user, state: {
+                'method': 'get', 'path': reverse('expense_timeseries'),
+                'data': [{}, {'interval': 'week', 'split': 'category'}, {'interval': 'month', 'tags': 'work'}][i % 3],
+            },
+            'expense_cache_stats': lambda i, user, state: {'method': 'get', 'path': reverse('expense_cache_stats')},
+            'category-list': lambda i, user, state: {'method': 'get', 'path': reverse('category-list')},
+            'category-detail': lambda i, user, state: {
+                'method': 'get', 'path': reverse('category-detail', args=[state['categories'][0]]),
+            },
+            'register': lambda i, user, state: {
+                'method': 'post', 'path': reverse('register'), 'auth': False, 'json': True,
+                'data': json.dumps({'username': f'{user.username}-reg-{i}', 'email': 'bench@example.com',
+                                    'password': PASSWORD, 'password2': PASSWORD}),
+            },
+            'login': lambda i, user, state: {
+                'method': 'post', 'path': reverse('login'), 'auth': False, 'json': True,
+                'data': json.dumps({'username': user.username, 'password': PASSWORD}),
+            },
+            'logout': lambda i, user, state: {
+                'method': 'post', 'path': reverse('logout'), 'access': fresh_access(user), 'json': True,
+                'data': json.dumps({'refresh': str(RefreshToken.for_user(user))}),
+            },
+            'token_refresh': lambda i, user, state: {
+                'method': 'post', 'path': reverse('token_refresh'), 'auth': False, 'json': True,
+                'data': json.dumps({'refresh': state['refresh'][user.id]}), 'after': keep_refresh,
+            },
+            'protected': lambda i, user, state: {'method': 'get', 'path': reverse('protected')},
+            'budget': lambda i, user, state: {'method': 'get', 'path': reverse('budget')},
+            'bulk_provision_users': lambda i, user, state: {
+                'method': 'post', 'path': reverse('bulk_provision_users'), 'json': True,
+                'data': json.dumps([{'username': f'{user.username}-bulk-{i}-{n}', 'email': 'bench@example.com',
+                                     'password': PASSWORD} for n in range(5)]),
+            },
+        }
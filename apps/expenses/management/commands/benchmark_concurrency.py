@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .benchmark_api import percentile
+
+# endpoint -> (WSGI path, ASGI path)
+ENDPOINTS = {
+    'summary': ('/api/expenses/summary/', '/api/async/expenses/summary/'),
+    'list': ('/api/expenses/', '/api/async/expenses/'),
+    'insights': ('/api/expenses/insights/', '/api/async/expenses/insights/'),
+}
+
+
+async def fetch(host, port, path, token, timeout):
+    # One connection per request: sync gunicorn workers close the connection after every response
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write((f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n'
+                      f'Connection: close\r\n\r\n').encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1]), len(response)
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput and tail latency of the WSGI and ASGI expense endpoints at several '
+            'concurrency levels, against servers that are already running')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help='Base URL of the gunicorn server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--asgi-url', help='Base URL of the uvicorn server, e.g. http://127.0.0.1:8002')
+        parser.add_argument('--username', required=True, help='User to mint an access token for')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='summary')
+        parser.add_argument('--concurrency', default='50,200,1000', help='Comma-separated client counts')
+        parser.add_argument('--requests-per-client', type=int, default=5)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--cached', action='store_true',
+                            help='Repeat identical requests instead of varying date_to, so results come from the cache')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        targets = {name: options[f'{name}_url'] for name in ('wsgi', 'asgi') if options[f'{name}_url']}
+        if not targets:
+            raise CommandError('Pass --wsgi-url, --asgi-url or both.')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+        token = str(AccessToken.for_user(user))
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        results = {}
+        for name, url in targets.items():
+            path = ENDPOINTS[options['endpoint']][0 if name == 'wsgi' else 1]
+            results[name] = {}
+            for clients in levels:
+                self.stderr.write(f'{name}: {clients} clients...')
+                results[name][str(clients)] = asyncio.run(self.run_level(url, path, token, clients, options))
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'endpoint': options['endpoint'],
+            'requests_per_client': options['requests_per_client'],
+            'cached': options['cached'],
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    async def run_level(self, url, path, token, clients, options):
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        today = timezone.localdate()
+        timings, statuses, errors = [], {}, 0
+
+        async def client(index):
+            nonlocal errors
+            for n in range(options['requests_per_client']):
+                query = '' if options['cached'] else '?' + urlencode({
+                    # A different date_to per request defeats the result cache
+                    'date_to': (today - timedelta(days=(index * options['requests_per_client'] + n) % 365)).isoformat()
+                })
+                started = time.perf_counter()
+                try:
+                    code, _ = await fetch(host, port, path + query, token, options['timeout'])
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50) * 1000, 1),
+            'p95_ms': round(percentile(timings, 95) * 1000, 1),
+            'p99_ms': round(percentile(timings, 99) * 1000, 1),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.categories.models import Category
+from apps.expenses.models import Expenses
+from apps.expenses.serializers import ExpensesSerializer, read_queryset, serialize_rows
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec of ExpensesSerializer against the values()-based list serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='5,100,10000', help='Comma-separated page sizes')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per size; the best one is reported')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        categories = list(Category.objects.all()[:10])
+        if not categories:
+            raise CommandError('No categories found; run migrations first.')
+
+        # Seed inside a transaction that is always rolled back
+        try:
+            with transaction.atomic():
+                self.run(sizes, categories, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, categories, repeat):
+        user = User.objects.create(username='serializer-benchmark')
+        today = timezone.localdate()
+        Expenses.objects.bulk_create([
+            Expenses(user=user, amount=Decimal(i % 5000) / 7, description=f'Benchmark expense {i}',
+                     category=categories[i % len(categories)], tags='work,bench' if i % 3 else '',
+                     date=today - timedelta(days=i % 365))
+            for i in range(max(sizes))
+        ], batch_size=2000)
+        renderer = JSONRenderer()
+        expenses = Expenses.objects.filter(user=user).order_by('-date', '-id')
+
+        self.stdout.write(f"{'rows':>8} {'serializer rows/s':>18} {'fast path rows/s':>18} {'speedup':>8}")
+        for size in sizes:
+            slow_json, slow = self.measure(
+                lambda: renderer.render(ExpensesSerializer(expenses.select_related('category')[:size], many=True).data),
+                repeat
+            )
+            fast_json, fast = self.measure(lambda: renderer.render(serialize_rows(read_queryset(expenses)[:size])), repeat)
+            if slow_json != fast_json:
+                raise CommandError(f'Output differs at {size} rows')
+            self.stdout.write(f'{size:>8} {size / slow:>18,.0f} {size / fast:>18,.0f} {slow / fast:>7.1f}x')
+
+    def measure(self, render, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
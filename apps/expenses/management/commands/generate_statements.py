@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from apps.expenses import statements
+
+
+class Command(BaseCommand):
+    help = ('Write the monthly statement of every active user, split into user-id ranges across a process pool. '
+            'Users that already have a statement for the month are skipped, so an interrupted run can be resumed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Statement month as YYYY-MM (default: last month)')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes; 1 runs in this process')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users per id range')
+        parser.add_argument('--force', action='store_true', help='Regenerate statements that already exist')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be at least 1.')
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid --month '{options['month']}'. Use YYYY-MM.")
+        else:
+            month = statements.month_bounds(timezone.localdate().replace(day=1))[0]
+
+        started = time.perf_counter()
+        ranges = statements.id_ranges(options['chunk_size'])
+        tasks = [(month, first_id, last_id, options['force']) for first_id, last_id in ranges]
+        written = skipped = 0
+
+        if options['workers'] == 1:
+            results = map(statements.generate_range, tasks)
+        else:
+            # Workers must open their own database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=statements.init_worker)
+            results = (future.result() for future in as_completed([pool.submit(statements.generate_range, task)
+                                                                    for task in tasks]))
+        try:
+            for done, (first_id, last_id, range_written, range_skipped) in enumerate(results, 1):
+                written += range_written
+                skipped += range_skipped
+                self.stderr.write(f'[{done}/{len(tasks)}] users {first_id}-{last_id}: '
+                                  f'{range_written} written, {range_skipped} already done')
+        finally:
+            if options['workers'] > 1:
+                pool.shutdown(cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{month:%Y-%m}: wrote {written} statements ({skipped} already done) in {elapsed:.2f}s '
+            f'with {options["workers"]} workers, {rate:.1f} statements/s.'
+        ))
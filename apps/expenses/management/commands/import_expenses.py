@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.expenses.importers import InvalidImportFile, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import expenses for a user from a CSV file (date, amount, description, category[, tags])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--date-format', default='%Y-%m-%d')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        def progress(report):
+            self.stdout.write(f'{report.created + report.rejected} rows read, {report.created} created, '
+                              f'{report.rejected} rejected ({report.rows_per_second} rows/s)')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                report = import_csv(user, f, date_format=options['date_format'],
+                                    batch_size=options['batch_size'], progress=progress)
+        except (OSError, InvalidImportFile) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} expenses in {report.seconds:.2f}s ({report.rows_per_second} rows/s).'
+        ))
+        if report.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {report.rejected} rows:'))
+            for reason, count in report.reasons.most_common():
+                self.stdout.write(f'  {reason}: {count}')
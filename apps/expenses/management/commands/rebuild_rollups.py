@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.expenses import rollups, streaks
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user daily expense rollups from the Expenses table, then the spending streaks from them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild rollups for this user id (can be repeated)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild(user_ids=options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} rollup rows.'))
+        users = streaks.rebuild(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt spending streaks for {users} users.'))
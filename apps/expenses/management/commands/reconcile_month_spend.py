@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.expenses import monthly_spend
+
+
+class Command(BaseCommand):
+    help = "Recount each profile's spend for the current month from the Expenses table and fix any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only reconcile this user id (can be repeated)')
+
+    def handle(self, *args, **options):
+        checked, fixed = monthly_spend.reconcile(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} profiles, fixed {fixed}.'))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Expenses = apps.get_model('expenses', 'Expenses')
+    DailyRollup = apps.get_model('expenses', 'DailyRollup')
+    rows = Expenses.objects.values('user_id', 'date', 'category_id').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(user_id=row['user_id'], day=row['date'], category_id=row['category_id'],
+                        total=row['total'], count=row['count'])
+            for row in rows
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_ensure_categories_production'),
+        ('expenses', '0006_add_performance_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='categories.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'category'), name='expenses_rollup_user_day_category')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
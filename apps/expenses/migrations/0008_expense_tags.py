@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    Expenses = apps.get_model('expenses', 'Expenses')
+    Tag = apps.get_model('expenses', 'Tag')
+    ExpenseTag = apps.get_model('expenses', 'ExpenseTag')
+
+    tag_ids = {}
+    links = []
+    rows = Expenses.objects.exclude(tags='').values_list('id', 'user_id', 'tags').iterator(chunk_size=2000)
+    for expense_id, user_id, tags in rows:
+        names = dict.fromkeys(tag.strip().lower() for tag in tags.split(',') if tag.strip())
+        for name in names:
+            if (user_id, name) not in tag_ids:
+                tag_ids[(user_id, name)] = Tag.objects.create(user_id=user_id, name=name).id
+            links.append(ExpenseTag(expense_id=expense_id, tag_id=tag_ids[(user_id, name)], user_id=user_id))
+    ExpenseTag.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_daily_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExpenseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_tags', to='expenses.expenses')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_tags', to='expenses.tag')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='expenses_tag_user_name'),
+        ),
+        migrations.AddIndex(
+            model_name='expensetag',
+            index=models.Index(fields=['user', 'tag'], name='expenses_ex_user_id_af9f3b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensetag',
+            constraint=models.UniqueConstraint(fields=('expense', 'tag'), name='expenses_expensetag_expense_tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
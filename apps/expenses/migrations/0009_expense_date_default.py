@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_expense_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expenses',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:04
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_streaks(apps, schema_editor):
+    DailyRollup = apps.get_model('expenses', 'DailyRollup')
+    SpendingRun = apps.get_model('expenses', 'SpendingRun')
+    SpendingStreak = apps.get_model('expenses', 'SpendingStreak')
+
+    runs_by_user = {}
+    rows = DailyRollup.objects.values_list('user_id', 'day').distinct().order_by('user_id', 'day')
+    for user_id, day in rows.iterator(chunk_size=2000):
+        runs = runs_by_user.setdefault(user_id, [])
+        if runs and runs[-1].end == day - timedelta(days=1):
+            runs[-1].end = day
+            runs[-1].days += 1
+        else:
+            runs.append(SpendingRun(user_id=user_id, start=day, end=day, days=1))
+
+    for user_id, runs in runs_by_user.items():
+        SpendingRun.objects.bulk_create(runs, batch_size=1000)
+        SpendingStreak.objects.create(user_id=user_id, current_start=runs[-1].start, last_day=runs[-1].end,
+                                      longest=max(run.days for run in runs))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('expenses', '0009_expense_date_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingStreak',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='spending_streak', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current_start', models.DateField(blank=True, null=True)),
+                ('last_day', models.DateField(blank=True, null=True)),
+                ('longest', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SpendingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('days', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'end'], name='expenses_sp_user_id_dec4fc_idx'), models.Index(fields=['user', 'days'], name='expenses_sp_user_id_6bcb81_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'start'), name='expenses_spendingrun_user_start')],
+            },
+        ),
+        migrations.RunPython(backfill_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from apps.expenses import search
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor, apps.get_model('expenses', 'Expenses'))
+
+
+def uninstall_search_index(apps, schema_editor):
+    search.uninstall(schema_editor, apps.get_model('expenses', 'Expenses'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0011_monthly_statements'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -1,5 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Expenses(models.Model):
@@ -8,7 +10,7 @@ class Expenses(models.Model):
     description = models.TextField()
     category = models.ForeignKey('categories.Category', on_delete=models.CASCADE)
     tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags (e.g., work,family,emergency)")
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -21,3 +23,106 @@ class Expenses(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.description} - ${self.amount}"
+
+
+class DailyRollup(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    category = models.ForeignKey('categories.Category', on_delete=models.CASCADE)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'category'], name='expenses_rollup_user_day_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day} - {self.category_id}: ${self.total} ({self.count})"
+
+
+class Tag(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=200)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='expenses_tag_user_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ExpenseTag(models.Model):
+    expense = models.ForeignKey(Expenses, on_delete=models.CASCADE, related_name='expense_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='expense_tags')
+    # Denormalized from expense.user so tag lookups stay on the (user, tag) index
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['expense', 'tag'], name='expenses_expensetag_expense_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'tag']),
+        ]
+
+
+class SpendingRun(models.Model):
+    # A maximal run of consecutive days with at least one expense
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    start = models.DateField()
+    end = models.DateField()
+    days = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'start'], name='expenses_spendingrun_user_start'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'end']),
+            models.Index(fields=['user', 'days']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.start} - {self.end} ({self.days} days)"
+
+
+class SpendingStreak(models.Model):
+    # Per-user summary of the SpendingRun rows, read by insights
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='spending_streak')
+    current_start = models.DateField(null=True, blank=True)
+    last_day = models.DateField(null=True, blank=True)
+    longest = models.PositiveIntegerField(default=0)
+
+    def current(self, today):
+        # Days in a row up to and including today; 0 when nothing was spent today
+        if self.last_day is not None and self.current_start <= today <= self.last_day:
+            return (today - self.current_start).days + 1
+        # Rows dated ahead of today can make a later run the latest one; streak_query
+        # annotates the start of the run that holds today
+        today_run_start = getattr(self, 'today_run_start', None)
+        return (today - today_run_start).days + 1 if today_run_start else 0
+
+    def __str__(self):
+        return f"{self.user_id}: longest {self.longest}, last {self.last_day}"
+
+
+class MonthlyStatement(models.Model):
+    # A user's summary for one closed month, written by the generate_statements command
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_statements')
+    month = models.DateField(help_text="First day of the statement month")
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='expenses_statement_user_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.month:%Y-%m}"
@@ -0,0 +1,119 @@
+"""
+Running spend for the current month, kept on UserProfile.
+
+Every expense write adds its delta for the current month with an F-expression
+update that only matches a profile already on this month. When the profile is
+still on an earlier month (or has never been filled), the row is locked and
+the month is recomputed from the daily rollups instead, which already include
+the write in progress. Readers roll a stale profile over the same way, so the
+budget endpoint and the summary never need to aggregate expenses.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from apps.authentication.models import UserProfile
+from .models import DailyRollup, Expenses
+
+MonthSpend = namedtuple('MonthSpend', ['month', 'spent', 'count'])
+
+
+def current_month():
+    return timezone.localdate().replace(day=1)
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_totals(queryset, date_field, amount_field, count_aggregate, month):
+    totals = queryset.filter(**{
+        f'{date_field}__gte': month,
+        f'{date_field}__lt': next_month(month),
+    }).aggregate(spent=Sum(amount_field), count=count_aggregate)
+    return totals['spent'] or Decimal('0'), totals['count'] or 0
+
+
+def apply_changes(user_id, added=(), removed=()):
+    month = current_month()
+    following = next_month(month)
+    to_date = Expenses._meta.get_field('date').to_python
+    amount, count = Decimal('0'), 0
+    for expense in added:
+        if month <= to_date(expense.date) < following:
+            amount += Decimal(str(expense.amount))
+            count += 1
+    for expense in removed:
+        if month <= to_date(expense.date) < following:
+            amount -= Decimal(str(expense.amount))
+            count -= 1
+    if not (amount or count):
+        return
+
+    if not UserProfile.objects.filter(user_id=user_id, month_start=month).update(
+        month_spent=F('month_spent') + amount, month_count=F('month_count') + count
+    ):
+        roll_over(user_id, month, amount, count)
+
+
+def roll_over(user_id, month, amount=0, count=0):
+    """
+    Bring the profile onto ``month`` and return its MonthSpend. ``amount`` and
+    ``count`` are a pending delta, applied only if another writer rolled the
+    profile over first (its recompute could not see our uncommitted rows).
+    """
+    with transaction.atomic():
+        profile, _ = UserProfile.objects.select_for_update().get_or_create(user_id=user_id)
+        if profile.month_start == month:
+            spent, total_count = profile.month_spent + amount, profile.month_count + count
+        else:
+            spent, total_count = month_totals(
+                DailyRollup.objects.filter(user_id=user_id), 'day', 'total', Sum('count'), month
+            )
+        # update() rather than save(): neither updated_at nor the profile signals should fire
+        UserProfile.objects.filter(pk=profile.pk).update(month_start=month, month_spent=spent, month_count=total_count)
+    return MonthSpend(month, spent, total_count)
+
+
+def read(user_id, month_start, month_spent, month_count):
+    # The profile's figures if they are for this month, otherwise roll it over first
+    month = current_month()
+    if month_start == month:
+        return MonthSpend(month, month_spent, month_count)
+    return roll_over(user_id, month)
+
+
+def reconcile(user_ids=None):
+    """
+    Compare every profile's month figures with the Expenses table and fix the
+    ones that drifted. Returns (profiles checked, profiles fixed).
+    """
+    month = current_month()
+    profiles = UserProfile.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    actual = {
+        row['user_id']: (row['spent'], row['count'])
+        for row in Expenses.objects.filter(
+            user_id__in=profiles.values('user_id'), date__gte=month, date__lt=next_month(month)
+        ).values('user_id').annotate(spent=Sum('amount'), count=Count('id')).order_by()
+    }
+
+    checked = fixed = 0
+    stored = profiles.values_list('user_id', 'month_start', 'month_spent', 'month_count')
+    for user_id, month_start, month_spent, month_count in stored.iterator(chunk_size=2000):
+        checked += 1
+        spent, count = actual.get(user_id, (Decimal('0'), 0))
+        if (month_start, month_spent, month_count) == (month, spent, count):
+            continue
+        with transaction.atomic():
+            # Recount under the lock so a write that landed since the scan is not undone
+            UserProfile.objects.select_for_update().filter(user_id=user_id).first()
+            spent, count = month_totals(Expenses.objects.filter(user_id=user_id), 'date', 'amount', Count('id'), month)
+            UserProfile.objects.filter(user_id=user_id).update(month_start=month, month_spent=spent, month_count=count)
+        fixed += 1
+    return checked, fixed
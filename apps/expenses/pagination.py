@@ -0,0 +1,115 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ExpensesPagination(PageNumberPagination):
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def page_queryset(self, queryset, request, count):
+        # The page's slice of ``count`` rows; evaluated by the caller, as with the cursor paginator
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = count
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        return self.page.object_list
+
+
+class ExpensesCursorPagination(BasePagination):
+    """
+    Keyset pagination over (date, id), newest first.
+
+    Each page is a range scan on the (user, date) index starting at the
+    cursor position, so there is no COUNT(*) and no OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        # The slice to fetch; evaluated by the caller so async views can use the async ORM
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = False
+
+        queryset = queryset.order_by('-date', '-id')
+        if self.cursor is not None:
+            position_date, position_id, self.reverse = self.cursor
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(date__gt=position_date) | Q(date=position_date, id__gt=position_id)
+                ).order_by('date', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(date__lt=position_date) | Q(date=position_date, id__lt=position_id)
+                )
+        self.fetch_size = page_size
+        return queryset[:page_size + 1]
+
+    def finish_page(self, rows):
+        has_more = len(rows) > self.fetch_size
+        rows = rows[:self.fetch_size]
+        if self.reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, self.cursor is not None
+
+        self.next_cursor = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position_date, position_id, reverse = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return date.fromisoformat(position_date), int(position_id), reverse == '1'
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, expense, reverse):
+        raw = f'{expense.date.isoformat()}|{expense.id}|{int(reverse)}'
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link(self.next_cursor)),
+            ('previous', self.get_link(self.previous_cursor)),
+            ('results', data),
+        ]))
@@ -0,0 +1,114 @@
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from .models import DailyRollup, Expenses
+
+# (day, category) pairs per statement, well inside SQLite's bound parameter limit
+BATCH_SIZE = 500
+
+
+def apply_changes(user_id, added=(), removed=()):
+    """
+    Apply the changed expenses to the user's rollups. Returns the days that
+    gained or lost a rollup row, the only ones whose spending runs can change.
+    """
+    # Fold the changed expenses into one delta per (day, category) before touching the table
+    to_date = DailyRollup._meta.get_field('day').to_python
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for expense in added:
+        delta = deltas[(to_date(expense.date), expense.category_id)]
+        delta[0] += Decimal(str(expense.amount))
+        delta[1] += 1
+    for expense in removed:
+        delta = deltas[(to_date(expense.date), expense.category_id)]
+        delta[0] -= Decimal(str(expense.amount))
+        delta[1] -= 1
+
+    growing = [(pair, delta) for pair, delta in deltas.items() if delta[1] > 0]
+    shrinking = [(pair, delta) for pair, delta in deltas.items() if delta[1] <= 0 and any(delta)]
+    changed_days = set()
+    for start in range(0, len(growing), BATCH_SIZE):
+        changed_days |= _upsert(user_id, growing[start:start + BATCH_SIZE])
+    for start in range(0, len(shrinking), BATCH_SIZE):
+        changed_days |= _subtract(user_id, shrinking[start:start + BATCH_SIZE])
+    return changed_days
+
+
+def _upsert(user_id, batch):
+    # One INSERT ... ON CONFLICT for the batch. A pair whose count comes back equal to its
+    # delta had no row before, since existing rows never hold a count of zero.
+    quote = connection.ops.quote_name
+    table, total, count = quote(DailyRollup._meta.db_table), quote('total'), quote('count')
+    sql = (
+        f'INSERT INTO {table} (user_id, {quote("day")}, category_id, {total}, {count}) VALUES '
+        + ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+        + f' ON CONFLICT (user_id, {quote("day")}, category_id) DO UPDATE'
+        f' SET {total} = {table}.{total} + excluded.{total}, {count} = {table}.{count} + excluded.{count}'
+        f' RETURNING {quote("day")}, category_id, {count}'
+    )
+    params = [value for (day, category_id), delta in batch for value in (user_id, day, category_id, *delta)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    to_date = DailyRollup._meta.get_field('day').to_python
+    deltas = dict(batch)
+    return {
+        to_date(day) for day, category_id, row_count in rows
+        if deltas[(to_date(day), category_id)][1] == row_count
+    }
+
+
+def _subtract(user_id, batch):
+    # One UPDATE for the batch, then the rows it emptied are dropped. The day and category
+    # filters are a superset of the pairs; rows outside them get the CASE default of zero.
+    rows = DailyRollup.objects.filter(
+        user_id=user_id,
+        day__in={day for (day, category_id), delta in batch},
+        category_id__in={category_id for (day, category_id), delta in batch},
+    )
+    pairs = [(Q(day=day, category_id=category_id), amount, count) for (day, category_id), (amount, count) in batch]
+    rows.update(
+        total=F('total') + Case(*[When(pair, then=Value(amount)) for pair, amount, count in pairs],
+                                default=Value(Decimal('0')), output_field=DailyRollup._meta.get_field('total')),
+        count=F('count') + Case(*[When(pair, then=Value(count)) for pair, amount, count in pairs],
+                                default=Value(0), output_field=IntegerField()),
+    )
+    if not any(count for pair, amount, count in pairs):
+        # Amount-only edits never empty a row
+        return set()
+    emptied = list(rows.filter(count=0).values_list('pk', 'day'))
+    DailyRollup.objects.filter(pk__in=[pk for pk, day in emptied]).delete()
+    return {day for pk, day in emptied}
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    expenses = Expenses.objects.all()
+    rollups = DailyRollup.objects.all()
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    rows = expenses.values('user_id', 'date', 'category_id').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by().iterator(chunk_size=batch_size)
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        while True:
+            batch = [
+                DailyRollup(user_id=row['user_id'], day=row['date'], category_id=row['category_id'],
+                            total=row['total'], count=row['count'])
+                for row in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            DailyRollup.objects.bulk_create(batch)
+            created += len(batch)
+    return created
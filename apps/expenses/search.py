@@ -0,0 +1,136 @@
+"""
+Full-text search over expense descriptions.
+
+SQLite keeps a contentless FTS5 table, ``expenses_search``, in sync with
+``expenses_expenses`` through triggers, so every write path (including bulk
+inserts and raw SQL) is covered. Next to the description it indexes an owner
+token per user, so a search only walks that user's postings. PostgreSQL uses a
+GIN index on the description's search vector. Other databases fall back to a
+case-insensitive substring scan.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX_NAME = 'expenses_description_search'
+_TERMS = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_search USING fts5("
+    "owner, description, content='', tokenize='unicode61 remove_diacritics 2')",
+    # A contentless table needs the old values to remove a row
+    "CREATE TRIGGER IF NOT EXISTS expenses_search_insert AFTER INSERT ON expenses_expenses BEGIN "
+    "INSERT INTO expenses_search(rowid, owner, description) VALUES (new.id, 'user' || new.user_id, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_search_delete AFTER DELETE ON expenses_expenses BEGIN "
+    "INSERT INTO expenses_search(expenses_search, rowid, owner, description) "
+    "VALUES ('delete', old.id, 'user' || old.user_id, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_search_update AFTER UPDATE OF description, user_id ON expenses_expenses "
+    "BEGIN "
+    "INSERT INTO expenses_search(expenses_search, rowid, owner, description) "
+    "VALUES ('delete', old.id, 'user' || old.user_id, old.description); "
+    "INSERT INTO expenses_search(rowid, owner, description) VALUES (new.id, 'user' || new.user_id, new.description); "
+    "END",
+]
+SQLITE_TEARDOWN = [
+    'DROP TRIGGER IF EXISTS expenses_search_update',
+    'DROP TRIGGER IF EXISTS expenses_search_delete',
+    'DROP TRIGGER IF EXISTS expenses_search_insert',
+    'DROP TABLE IF EXISTS expenses_search',
+]
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('description', config=SEARCH_CONFIG)
+
+
+def search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    return GinIndex(search_vector(), name=SEARCH_INDEX_NAME)
+
+
+def install(schema_editor, model):
+    """Create the search index for ``schema_editor``'s database; safe to run again."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'expenses_search'")
+            exists = cursor.fetchone() is not None
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if not exists:
+                cursor.execute("INSERT INTO expenses_search(rowid, owner, description) "
+                               "SELECT id, 'user' || user_id, description FROM expenses_expenses")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+        schema_editor.add_index(model, search_index())
+
+
+def restore_triggers(using, **kwargs):
+    # post_migrate: SQLite drops a table's triggers when a migration rebuilds it
+    db = connections[using]
+    if db.vendor != 'sqlite' or 'expenses_search' not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        for statement in SQLITE_SCHEMA[1:]:
+            cursor.execute(statement)
+
+
+def uninstall(schema_editor, model):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_TEARDOWN:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+
+
+def parse_terms(value):
+    return _TERMS.findall(value.lower())
+
+
+def search(queryset, value, user_id=None):
+    """
+    Filter ``queryset`` to expenses whose description matches every word of
+    ``value`` (prefix matches included on SQLite) and annotate ``search_rank``,
+    higher for better matches. Passing the ``user_id`` the queryset is limited
+    to lets SQLite skip other users' matches inside the index.
+    """
+    terms = parse_terms(value)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        # Words only, so nothing in them needs escaping in the MATCH expression
+        words = ' '.join(f'"{term}"*' for term in terms)
+        match = f'description : ({words})'
+        if user_id is not None:
+            match = f'owner : "user{user_id}" AND {match}'
+        table = queryset.model._meta.db_table
+        # bm25() is lower for better matches; the owner column carries no weight
+        rank = RawSQL(
+            f'SELECT -bm25(expenses_search, 0.0, 1.0) FROM expenses_search '
+            f'WHERE expenses_search MATCH %s AND expenses_search.rowid = "{table}"."id"',
+            [match], output_field=FloatField(),
+        )
+        matches = RawSQL('SELECT rowid FROM expenses_search WHERE expenses_search MATCH %s', [match])
+        return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-date', '-id')
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG)
+        vector = search_vector()
+        return queryset.alias(search_document=vector).filter(search_document=query).annotate(
+            search_rank=SearchRank(vector, query)
+        ).order_by('-search_rank', '-date', '-id')
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(description__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0)).order_by('-date', '-id')
+
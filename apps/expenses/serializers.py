@@ -1,12 +1,72 @@
+from django.utils import timezone
 from rest_framework import serializers
+from apps.categories import registry
+from apps.categories.models import Category
 from .models import Expenses
 
 
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    # Resolves ids through the in-process category registry instead of querying per expense
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        
+        category = registry.get(pk)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
 class ExpensesSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source='user.username', read_only=True)
+    category = CategoryField(queryset=Category.objects.all())
     category_name = serializers.CharField(source='category.name', read_only=True)
     
     class Meta:
         model = Expenses
         fields = ['id', 'user', 'amount', 'description', 'category', 'category_name', 'tags', 'date', 'timestamp']
-        read_only_fields = ['id', 'user', 'category_name', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'category_name', 'timestamp']
+    
+    def validate_date(self, value):
+        # Future-dated rows would end streaks early and leak into "this week"
+        if value > timezone.localdate():
+            raise serializers.ValidationError('Date cannot be in the future.')
+        return value
+
+
+# Columns read by the fast list path, in ExpensesSerializer field order
+READ_COLUMNS = ['id', 'user__username', 'amount', 'description', 'category_id', 'category__name', 'tags', 'date',
+                'timestamp']
+
+
+def read_queryset(queryset):
+    # Named rows keep attribute access (row.id, row.date) for the paginators
+    return queryset.values_list(*READ_COLUMNS, named=True)
+
+
+def serialize_rows(rows):
+    """
+    Read-only equivalent of ``ExpensesSerializer(expenses, many=True).data`` for
+    rows from ``read_queryset``. Skips model instances and per-field serializer
+    dispatch while rendering to the same JSON.
+    """
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+    timestamp = serializers.DateTimeField().to_representation
+    return [
+        {
+            'id': row.id,
+            'user': row.user__username,
+            'amount': amount(row.amount),
+            'description': row.description,
+            'category': row.category_id,
+            'category_name': row.category__name,
+            'tags': row.tags,
+            'date': row.date.isoformat(),
+            'timestamp': timestamp(row.timestamp),
+        }
+        for row in rows
+    ]
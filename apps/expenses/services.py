@@ -0,0 +1,193 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+from apps.authentication.models import UserProfile
+from . import monthly_spend
+from .filters import ExpenseFilter
+from .models import DailyRollup, ExpenseTag, Expenses, SpendingRun, SpendingStreak
+
+
+SummarySource = namedtuple('SummarySource', ['queryset', 'amount_field', 'count_aggregate', 'date_field', 'expenses'])
+
+
+def summary_source(user, params):
+    # Read the daily rollup table when the filters allow it, otherwise the raw expenses.
+    # ``expenses`` is always the filtered Expenses queryset, used for the tag breakdown.
+    expense_filter = ExpenseFilter(params, queryset=Expenses.objects.filter(user=user), user=user)
+    rollups = expense_filter.filter_rollups(DailyRollup.objects.filter(user=user))
+    if rollups is not None:
+        return SummarySource(rollups, 'total', Sum('count'), 'day', expense_filter.qs)
+    return SummarySource(expense_filter.qs, 'amount', Count('id'), 'date', expense_filter.qs)
+
+
+def _breakdown(queryset, kind, name_field, amount_field, count_aggregate, date_field, current_month, last_month):
+    return queryset.values(name=F(name_field)).annotate(
+        breakdown_total=Sum(amount_field),
+        breakdown_count=count_aggregate,
+        current_month_total=Sum(amount_field, filter=Q(**{f'{date_field}__gte': current_month})),
+        last_month_total=Sum(amount_field, filter=Q(**{
+            f'{date_field}__gte': last_month,
+            f'{date_field}__lt': current_month,
+        })),
+        kind=Value(kind),
+    ).order_by()
+
+
+def summary_rows(user, params):
+    # Everything except the budget comes from one statement: the category and tag
+    # breakdowns are grouped with conditional aggregation and combined with UNION ALL,
+    # then totals and month figures are folded together from the category rows.
+    source = summary_source(user, params)
+
+    current_month = timezone.now().date().replace(day=1)
+    last_month = (current_month - timedelta(days=1)).replace(day=1)
+
+    category_rows = _breakdown(
+        source.queryset, 'category', 'category__name', source.amount_field, source.count_aggregate,
+        source.date_field, current_month, last_month
+    )
+    tag_rows = _breakdown(
+        ExpenseTag.objects.filter(user=user, expense__in=source.expenses), 'tag', 'tag__name',
+        'expense__amount', Count('id'), 'expense__date', current_month, last_month
+    )
+    return category_rows.union(tag_rows, all=True)
+
+
+def monthly_budget_query(user):
+    return UserProfile.objects.filter(user=user).values_list(
+        'monthly_budget', 'month_start', 'month_spent', 'month_count'
+    )
+
+
+def budget_and_spend(user_id, row):
+    # (monthly budget, spend this month) from a monthly_budget_query row, which may be missing
+    monthly_budget, *month = row or (0, None, 0, 0)
+    return monthly_budget, monthly_spend.read(user_id, *month).spent
+
+
+def build_summary(user, params, monthly_budget=None, month_spent=None):
+    rows = list(summary_rows(user, params))
+    if monthly_budget is None or month_spent is None:
+        monthly_budget, month_spent = budget_and_spend(user.id, monthly_budget_query(user).first())
+    return summarize(rows, monthly_budget, params, month_spent)
+
+
+def summarize(rows, monthly_budget, params, month_spent=None):
+    # ``month_spent`` is the profile's running spend for this month; without it the
+    # budget is compared with the total of ``rows``, as for a monthly statement
+    rows = sorted(rows, key=lambda row: row['breakdown_total'], reverse=True)
+    categories = [row for row in rows if row['kind'] == 'category']
+    tags = [row for row in rows if row['kind'] == 'tag']
+    monthly_budget = monthly_budget or 0
+
+    total_amount = sum(cat['breakdown_total'] for cat in categories)
+    total_count = sum(cat['breakdown_count'] for cat in categories)
+    category_breakdown = []
+
+    for cat in categories:
+        percentage = (cat['breakdown_total'] / total_amount * 100) if total_amount > 0 else 0
+        category_breakdown.append({
+            'name': cat['name'],
+            'total': cat['breakdown_total'],
+            'count': cat['breakdown_count'],
+            'percentage': round(percentage, 2)
+        })
+
+    spent = total_amount if month_spent is None else month_spent
+    budget_status = {
+        'monthly_budget': float(monthly_budget),
+        'spent': float(spent),
+        'remaining': float(monthly_budget) - float(spent),
+        'percentage_used': round((float(spent) / float(monthly_budget) * 100), 2) if monthly_budget > 0 else 0
+    }
+
+    this_month = [cat for cat in categories if cat['current_month_total'] is not None]
+    current_month_total = sum(cat['current_month_total'] for cat in this_month)
+    last_month_total = sum(cat['last_month_total'] or 0 for cat in categories)
+
+    if last_month_total > 0:
+        month_change = ((current_month_total - last_month_total) / last_month_total) * 100
+    else:
+        month_change = 100 if current_month_total > 0 else 0
+
+    top_category = max(this_month, key=lambda cat: cat['current_month_total'], default=None)
+
+    spending_insights = {
+        'current_month_spending': current_month_total,
+        'last_month_spending': last_month_total,
+        'month_over_month_change': round(month_change, 2),
+        'trend': 'increasing' if month_change > 0 else 'decreasing' if month_change < 0 else 'stable',
+        'top_category_this_month': top_category['name'] if top_category else None,
+        'top_category_amount': top_category['current_month_total'] if top_category else 0
+    }
+
+    return {
+        'summary': {
+            'total_amount': total_amount,
+            'total_count': total_count,
+            'average_amount': round(total_amount / total_count, 2) if total_count else 0
+        },
+        'category_breakdown': category_breakdown,
+        'tag_breakdown': [
+            {'name': tag['name'], 'total': tag['breakdown_total'], 'count': tag['breakdown_count']}
+            for tag in tags
+        ],
+        'budget_status': budget_status,
+        'spending_insights': spending_insights,
+        'period': params.get('period', 'all_time')
+    }
+
+
+def insights_rows(user):
+    # (day, total) rollup rows for the last week, oldest day and today included
+    today = timezone.now().date()
+    return DailyRollup.objects.filter(
+        user=user, day__gte=today - timedelta(days=7), day__lte=today
+    ).values_list('day', 'total')
+
+
+def streak_query(user):
+    today = timezone.now().date()
+    today_run = SpendingRun.objects.filter(user_id=OuterRef('user_id'), start__lte=today, end__gte=today)
+    return SpendingStreak.objects.filter(user=user).annotate(today_run_start=Subquery(today_run.values('start')[:1]))
+
+
+def build_insights(rows, streak):
+    try:
+        weekly_total = sum(total for day, total in rows) or 0
+        daily_average = weekly_total / 7
+        
+        # Maintained incrementally by apps.expenses.streaks, so any length is reported
+        today = timezone.now().date()
+        current_streak = streak.current(today) if streak else 0
+        
+        warnings = []
+        if weekly_total > 100:
+            warnings.append("High spending this week")
+        
+        return {
+            'weekly_spending': float(weekly_total),
+            'daily_average': round(daily_average, 2),
+            'spending_streak_days': current_streak,
+            'longest_streak_days': streak.longest if streak else 0,
+            'last_spend_day': streak.last_day if streak else None,
+            'warnings': warnings,
+            'insights': [
+                f"You've spent money {current_streak} days in a row" if current_streak > 1 else "No recent spending streak",
+                f"Your daily average this week is ${daily_average:.2f}",
+                f"Weekly spending: ${weekly_total}"
+            ]
+        }
+    except (ValueError, TypeError, AttributeError):
+        return {
+            'weekly_spending': 0,
+            'daily_average': 0,
+            'spending_streak_days': 0,
+            'longest_streak_days': 0,
+            'last_spend_day': None,
+            'warnings': [],
+            'insights': ["No spending data available"]
+        }
@@ -0,0 +1,67 @@
+from collections import defaultdict, namedtuple
+
+from django.db.models.signals import pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from apps.authentication.models import UserProfile
+from apps.categories.models import Category
+
+from . import monthly_spend, rollups, streaks, tags
+from .models import DailyRollup, Expenses
+
+# Sent inside the writing transaction by every code path that changes Expenses rows.
+# Receivers get ``user_id`` plus ``added`` and ``removed`` sequences of expenses
+# (model instances or ExpenseSnapshot tuples), and ``created`` when every added
+# expense was just inserted.
+expenses_changed = Signal()
+
+ExpenseSnapshot = namedtuple('ExpenseSnapshot', ['date', 'category_id', 'amount'])
+
+
+def snapshot(expense):
+    # Capture the fields derived data depends on before an expense is modified
+    return ExpenseSnapshot(expense.date, expense.category_id, expense.amount)
+
+
+@receiver(expenses_changed)
+def update_daily_rollups(sender, user_id, added=(), removed=(), **kwargs):
+    # Another expense on a day that already had spending leaves the runs as they are
+    streaks.apply_changes(user_id, rollups.apply_changes(user_id, added, removed))
+
+
+@receiver(expenses_changed)
+def update_month_spend(sender, user_id, added=(), removed=(), **kwargs):
+    # Runs after update_daily_rollups, which a month rollover recomputes from
+    monthly_spend.apply_changes(user_id, added, removed)
+
+
+@receiver(expenses_changed)
+def sync_expense_tags(sender, user_id, added=(), created=False, **kwargs):
+    # Removed expenses lose their tag links through the foreign key cascade
+    tags.sync_tags(user_id, added, replace=not created)
+
+
+@receiver(expenses_changed)
+def touch_expenses_watermark(sender, user_id, added=(), removed=(), **kwargs):
+    # The watermark versions the cached results and the ETags, in every worker. Closed time
+    # series buckets have their own, which only a write dated before today can move.
+    now = timezone.now()
+    watermarks = {'expenses_modified_at': now}
+    to_date = DailyRollup._meta.get_field('day').to_python
+    if any(to_date(expense.date) < timezone.localdate() for expense in [*added, *removed]):
+        watermarks['closed_buckets_modified_at'] = now
+    if not UserProfile.objects.filter(user_id=user_id).update(**watermarks):
+        UserProfile.objects.update_or_create(user_id=user_id, defaults=watermarks)
+
+
+@receiver(pre_delete, sender=Category)
+def remove_category_expenses(sender, instance, **kwargs):
+    # Deleting a category cascades to its expenses without going through writes.py, so they
+    # are removed from the derived data here, while the rollups still hold them
+    removed = defaultdict(list)
+    rows = Expenses.objects.filter(category=instance).values_list('user_id', 'date', 'category_id', 'amount')
+    for user_id, *fields in rows.iterator():
+        removed[user_id].append(ExpenseSnapshot(*fields))
+    for user_id, expenses in removed.items():
+        expenses_changed.send(sender=Expenses, user_id=user_id, removed=expenses)
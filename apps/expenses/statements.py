@@ -0,0 +1,114 @@
+"""
+Monthly statements for many users at once.
+
+A statement is the summary endpoint's payload for one closed month. Instead of
+one summary per user, ``generate`` builds the statements of a whole user-id
+range from two grouped statements (category and tag breakdowns for every user
+in the range) and one budget lookup, then upserts them in one transaction.
+Users that already have a statement for the month are skipped, so a run that
+died halfway picks up where it stopped.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value
+
+from apps.authentication.models import UserProfile
+from .models import DailyRollup, ExpenseTag, MonthlyStatement
+from .services import summarize
+
+
+def month_bounds(month):
+    # (previous month, month, following month), all first days
+    previous = (month - timedelta(days=1)).replace(day=1)
+    following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return previous, month, following
+
+
+def _grouped(queryset, kind, name_field, amount_field, count_aggregate, date_field, month):
+    previous, month, following = month_bounds(month)
+    in_month = Q(**{f'{date_field}__gte': month})
+    return queryset.filter(**{
+        f'{date_field}__gte': previous,
+        f'{date_field}__lt': following,
+    }).values('user_id', name=F(name_field)).annotate(
+        breakdown_total=Sum(amount_field, filter=in_month),
+        breakdown_count=count_aggregate(in_month),
+        current_month_total=Sum(amount_field, filter=in_month),
+        last_month_total=Sum(amount_field, filter=~in_month),
+        kind=Value(kind),
+    ).order_by()
+
+
+def statement_rows(month, first_id, last_id):
+    # Category and tag rows for every user in [first_id, last_id], shaped like summary_rows
+    category_rows = _grouped(
+        DailyRollup.objects.filter(user_id__gte=first_id, user_id__lte=last_id), 'category', 'category__name',
+        'total', lambda condition: Sum('count', filter=condition), 'day', month
+    )
+    tag_rows = _grouped(
+        ExpenseTag.objects.filter(user_id__gte=first_id, user_id__lte=last_id), 'tag', 'tag__name',
+        'expense__amount', lambda condition: Count('id', filter=condition), 'expense__date', month
+    )
+    return category_rows.union(tag_rows, all=True)
+
+
+def build_statement(rows, monthly_budget, month):
+    # Rows for categories only spent on in the previous month still count towards its total
+    rows = [
+        {**row, 'breakdown_total': row['breakdown_total'] or 0, 'breakdown_count': row['breakdown_count'] or 0}
+        for row in rows
+    ]
+    data = summarize(rows, monthly_budget, {'period': f'{month:%Y-%m}'})
+    data['category_breakdown'] = [category for category in data['category_breakdown'] if category['count']]
+    data['tag_breakdown'] = [tag for tag in data['tag_breakdown'] if tag['count']]
+    data['month'] = month
+    return data
+
+
+def generate(month, first_id, last_id, force=False):
+    """Write statements for the active users in [first_id, last_id]; returns (written, skipped)."""
+    users = User.objects.filter(id__gte=first_id, id__lte=last_id, is_active=True)
+    pending = users if force else users.exclude(monthly_statements__month=month)
+    user_ids = list(pending.values_list('id', flat=True))
+    skipped = users.count() - len(user_ids) if not force else 0
+    if not user_ids:
+        return 0, skipped
+
+    rows_by_user = defaultdict(list)
+    for row in statement_rows(month, first_id, last_id):
+        rows_by_user[row['user_id']].append(row)
+    budgets = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'monthly_budget'))
+
+    statements = [
+        MonthlyStatement(user_id=user_id, month=month,
+                         data=build_statement(rows_by_user[user_id], budgets.get(user_id), month))
+        for user_id in user_ids
+    ]
+    with transaction.atomic():
+        MonthlyStatement.objects.bulk_create(
+            statements, batch_size=settings.EXPENSE_BULK_BATCH_SIZE,
+            update_conflicts=True, unique_fields=['user', 'month'], update_fields=['data', 'generated_at'],
+        )
+    return len(statements), skipped
+
+
+def id_ranges(chunk_size):
+    # Consecutive (first id, last id) ranges holding ``chunk_size`` active users each
+    ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+    return [(ids[i], ids[min(i + chunk_size, len(ids)) - 1]) for i in range(0, len(ids), chunk_size)]
+
+
+def init_worker():
+    # Forked workers already have Django loaded; spawned ones (macOS, Windows) need it set up
+    django.setup()
+
+
+def generate_range(args):
+    # Process pool entry point
+    month, first_id, last_id, force = args
+    return (first_id, last_id, *generate(month, first_id, last_id, force))
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import DailyRollup, SpendingRun, SpendingStreak
+
+
+def runs_from_days(user_id, days):
+    # Group sorted, distinct days into SpendingRun objects
+    runs = []
+    for day in days:
+        if runs and runs[-1].end == day - timedelta(days=1):
+            runs[-1].end = day
+            runs[-1].days += 1
+        else:
+            runs.append(SpendingRun(user_id=user_id, start=day, end=day, days=1))
+    return runs
+
+
+def apply_changes(user_id, days):
+    """
+    Recompute the spending runs around ``days`` after their rollups changed.
+
+    Only runs touching [min(days) - 1, max(days) + 1] are replaced, rebuilt from
+    the distinct rollup days in the range they cover, so the cost follows the
+    affected range rather than the user's whole history.
+    """
+    if not days:
+        return
+    # Unsaved-then-bulk-created instances may still carry ISO strings
+    days = {DailyRollup._meta.get_field('day').to_python(day) for day in days}
+    # Serializes concurrent writers for the same user
+    streak, _ = SpendingStreak.objects.select_for_update().get_or_create(user_id=user_id)
+
+    one_day = timedelta(days=1)
+    low, high = min(days), max(days)
+    touching = list(SpendingRun.objects.filter(
+        user_id=user_id, start__lte=high + one_day, end__gte=low - one_day
+    ).order_by('start'))
+    if touching:
+        low, high = min(low, touching[0].start), max(high, touching[-1].end)
+
+    spending_days = DailyRollup.objects.filter(
+        user_id=user_id, day__gte=low, day__lte=high
+    ).values_list('day', flat=True).distinct().order_by('day')
+    runs = runs_from_days(user_id, spending_days)
+    if [(run.start, run.end) for run in runs] == [(run.start, run.end) for run in touching]:
+        # e.g. a second expense on a day that already counted
+        return
+
+    if touching:
+        SpendingRun.objects.filter(pk__in=[run.pk for run in touching]).delete()
+    SpendingRun.objects.bulk_create(runs)
+
+    # The latest and longest runs only need a lookup when one of them was replaced by something shorter
+    if runs and (streak.last_day is None or runs[-1].end >= streak.last_day):
+        streak.current_start, streak.last_day = runs[-1].start, runs[-1].end
+    elif any(run.end == streak.last_day for run in touching):
+        streak.current_start, streak.last_day = SpendingRun.objects.filter(
+            user_id=user_id
+        ).order_by('-end').values_list('start', 'end').first() or (None, None)
+
+    longest_new = max((run.days for run in runs), default=0)
+    if longest_new >= streak.longest:
+        streak.longest = longest_new
+    elif any(run.days == streak.longest for run in touching):
+        streak.longest = SpendingRun.objects.filter(
+            user_id=user_id
+        ).order_by('-days').values_list('days', flat=True).first() or 0
+    streak.save()
+
+
+def _refresh(streak):
+    runs = SpendingRun.objects.filter(user_id=streak.user_id)
+    streak.current_start, streak.last_day = runs.order_by('-end').values_list('start', 'end').first() or (None, None)
+    streak.longest = runs.order_by('-days').values_list('days', flat=True).first() or 0
+    streak.save()
+
+
+def rebuild(user_ids=None):
+    rollups = DailyRollup.objects.all()
+    runs = SpendingRun.objects.all()
+    streaks = SpendingStreak.objects.all()
+    if user_ids is not None:
+        rollups = rollups.filter(user_id__in=user_ids)
+        runs = runs.filter(user_id__in=user_ids)
+        streaks = streaks.filter(user_id__in=user_ids)
+
+    days_by_user = {}
+    for user_id, day in rollups.values_list('user_id', 'day').distinct().order_by('user_id', 'day').iterator():
+        days_by_user.setdefault(user_id, []).append(day)
+
+    with transaction.atomic():
+        runs.delete()
+        streaks.exclude(user_id__in=list(days_by_user)).update(current_start=None, last_day=None, longest=0)
+        for user_id, days in days_by_user.items():
+            SpendingRun.objects.bulk_create(runs_from_days(user_id, days))
+            _refresh(SpendingStreak(user_id=user_id))
+    return len(days_by_user)
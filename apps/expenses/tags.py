@@ -0,0 +1,29 @@
+from .models import ExpenseTag, Tag
+
+
+def parse_tags(value):
+    # "Work, family,,work" -> ['work', 'family']
+    tags = (tag.strip().lower() for tag in (value or '').split(','))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def sync_tags(user_id, expenses, replace=True):
+    # Replace the ExpenseTag rows of the given (saved) expenses with the tags in their text field;
+    # new expenses (``replace=False``) have no rows to remove
+    wanted = {expense.id: parse_tags(expense.tags) for expense in expenses}
+    if not wanted:
+        return
+
+    if replace:
+        ExpenseTag.objects.filter(expense_id__in=list(wanted)).delete()
+    names = {name for tags in wanted.values() for name in tags}
+    if not names:
+        return
+
+    Tag.objects.bulk_create([Tag(user_id=user_id, name=name) for name in names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.filter(user_id=user_id, name__in=names).values_list('name', 'id'))
+    ExpenseTag.objects.bulk_create([
+        ExpenseTag(expense_id=expense_id, tag_id=tag_ids[name], user_id=user_id)
+        for expense_id, tags in wanted.items()
+        for name in tags
+    ], batch_size=1000)
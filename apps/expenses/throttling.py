@@ -0,0 +1,99 @@
+"""
+Token-bucket throttling with state shared by every worker on the host.
+
+A rate such as ``200/hour`` becomes a bucket of 200 tokens refilled at
+200 tokens per hour. Each (scope, user) bucket is one row holding its token
+count and last update time in a SQLite file at THROTTLE_STORE_PATH. A request
+refills and takes a token in one UPSERT, so concurrent workers never lose
+updates and the stored state stays the same size however many requests
+arrive.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+_TAKE = '''
+    INSERT INTO buckets (key, tokens, updated) VALUES (:key, :capacity - 1, :now)
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = MIN(:capacity, tokens + MAX(:now - updated, 0) * :rate) - 1,
+        updated = MAX(updated, :now)
+    WHERE MIN(:capacity, tokens + MAX(:now - updated, 0) * :rate) >= 1
+    RETURNING tokens
+'''
+_PEEK = 'SELECT MIN(:capacity, tokens + MAX(:now - updated, 0) * :rate) FROM buckets WHERE key = :key'
+
+
+class SQLiteBucketStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, opened again after a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def take(self, key, capacity, rate, now=None):
+        """Take a token from ``key``'s bucket. Returns (allowed, seconds until a token is available)."""
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': time.time() if now is None else now}
+        connection = self._connection()
+        if connection.execute(_TAKE, params).fetchone() is not None:
+            return True, 0
+        tokens = connection.execute(_PEEK, params).fetchone()[0]
+        return False, (1 - tokens) / rate
+
+    def clear(self):
+        self._connection().execute('DELETE FROM buckets')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = settings.THROTTLE_STORE_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SQLiteBucketStore(path)
+        return _stores[path]
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Per-user token bucket for ``scope``; anonymous requests are keyed by IP."""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_seconds = get_store().take(key, self.num_requests, self.num_requests / self.duration)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ExpenseRateThrottle(TokenBucketThrottle):
+    scope = 'expense'
+
+
+class SummaryRateThrottle(TokenBucketThrottle):
+    scope = 'summary'
@@ -0,0 +1,153 @@
+"""
+Spend over time in day, week or month buckets.
+
+Ranges are widened to whole buckets so every bucket is complete. Buckets come
+from one grouped query, over DailyRollup unless a filter needs the expense
+rows. Buckets that ended before today can only change through a backdated
+write, so they are cached as one entry keyed on the profile's
+closed_buckets_modified_at watermark, which only such writes move. Requests
+then compute just the open bucket.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.categories import registry
+from . import cache as expense_cache
+from .filters import ExpenseFilter, normalize_params, period_start
+from .models import DailyRollup, Expenses
+
+INTERVALS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+# Buckets returned when no date_from is given
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12}
+MAX_BUCKETS = 1000
+# Parameters that define the range rather than filter the expenses
+RANGE_PARAMS = ('date_from', 'date_to', 'period')
+
+
+class InvalidSeries(ValueError):
+    pass
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=7)
+    if interval == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _closed_key(user_id, interval, split, filter_params, first, last, version):
+    raw = repr((interval, split, normalize_params(filter_params), first.isoformat(), last.isoformat(),
+                version and version.isoformat()))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'expenses:series:{user_id}:{digest}'
+
+
+def _compute(user, interval, split, filter_params, first, last):
+    # {bucket start: {'total', 'count', 'categories': {category id: (total, count)}}} for [first, last]
+    expense_filter = ExpenseFilter(filter_params, queryset=Expenses.objects.filter(user=user), user=user)
+    rollups = expense_filter.filter_rollups(DailyRollup.objects.filter(user=user))
+    if rollups is not None:
+        queryset, day_field, amount_field, count_aggregate = rollups, 'day', 'total', Sum('count')
+    else:
+        queryset, day_field, amount_field, count_aggregate = expense_filter.qs, 'date', 'amount', Count('id')
+
+    group_by = ['bucket', 'category_id'] if split else ['bucket']
+    rows = queryset.filter(**{
+        f'{day_field}__gte': first,
+        f'{day_field}__lt': next_bucket(last, interval),
+    }).annotate(bucket=INTERVALS[interval](day_field)).values(*group_by).annotate(
+        bucket_total=Sum(amount_field),
+        bucket_count=count_aggregate,
+    ).order_by()
+
+    buckets = {}
+    for row in rows:
+        bucket = buckets.setdefault(row['bucket'], {'total': 0, 'count': 0, 'categories': {}})
+        bucket['total'] += row['bucket_total']
+        bucket['count'] += row['bucket_count']
+        if split:
+            bucket['categories'][row['category_id']] = (row['bucket_total'], row['bucket_count'])
+    return buckets
+
+
+def build_series(user, params, closed_version=None):
+    interval = params.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise InvalidSeries(f"Unsupported interval '{interval}'. Use one of: {', '.join(INTERVALS)}.")
+    split = params.get('split', '')
+    if split not in ('', 'category'):
+        raise InvalidSeries("Unsupported split. Use 'category' or leave it out.")
+
+    range_filter = ExpenseFilter(params, queryset=Expenses.objects.none())
+    range_filter.is_valid()  # invalid values are ignored, as in the other endpoints
+    data = range_filter.form.cleaned_data
+    today = timezone.localdate()
+    last = bucket_start(data.get('date_to') or today, interval)
+    first = last
+    for _ in range(DEFAULT_BUCKETS[interval] - 1):
+        first = bucket_start(first - timedelta(days=1), interval)
+    first = bucket_start(max(filter(None, [
+        data.get('date_from') or first, period_start(data.get('period'))
+    ])), interval)
+
+    starts = []
+    start = first
+    while start <= last:
+        starts.append(start)
+        if len(starts) > MAX_BUCKETS:
+            raise InvalidSeries(f'At most {MAX_BUCKETS} buckets per request; narrow the date range.')
+        start = next_bucket(start, interval)
+
+    filter_params = params.copy()
+    for name in RANGE_PARAMS:
+        filter_params.pop(name, None)
+
+    empty = {'total': 0, 'count': 0, 'categories': {}}
+    closed = [start for start in starts if next_bucket(start, interval) <= today]
+    key = closed and _closed_key(user.id, interval, split, filter_params, closed[0], closed[-1], closed_version)
+    buckets = cache.get(key) if closed else None
+    if buckets is None:
+        expense_cache.stats['misses'] += 1
+        computed = _compute(user, interval, split, filter_params, first, last)
+        buckets = {start: computed.get(start, empty) for start in starts}
+        if closed:
+            cache.set(key, {start: buckets[start] for start in closed}, settings.EXPENSE_SERIES_CACHE_TIMEOUT)
+    else:
+        expense_cache.stats['hits'] += 1
+        if len(closed) < len(starts):
+            computed = _compute(user, interval, split, filter_params, starts[len(closed)], last)
+            buckets.update({start: computed.get(start, empty) for start in starts[len(closed):]})
+
+    series = []
+    for start in starts:
+        bucket = buckets[start]
+        entry = {'start': start, 'total': bucket['total'], 'count': bucket['count']}
+        if split:
+            entry['categories'] = [
+                {'id': category_id, 'name': getattr(registry.get(category_id), 'name', None),
+                 'total': total, 'count': count}
+                for category_id, (total, count) in sorted(bucket['categories'].items(), key=lambda item: -item[1][0])
+            ]
+        series.append(entry)
+
+    return {
+        'interval': interval,
+        'date_from': first,
+        'date_to': next_bucket(last, interval) - timedelta(days=1),
+        'buckets': series,
+    }
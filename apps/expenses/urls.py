@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     path('', views.list_expenses, name='list_expenses'),
     path('create/', views.create_expense, name='create_expense'),
+    path('bulk/', views.bulk_create_expenses, name='bulk_create_expenses'),
+    path('export/', views.export_expenses, name='export_expenses'),
+    path('import/', views.import_expenses, name='import_expenses'),
     path('<int:pk>/update/', views.update_expense, name='update_expense'),
     path('<int:pk>/delete/', views.delete_expense, name='delete_expense'),
     path('summary/', views.summary, name='expense_summary'),
     path('insights/', views.insights, name='spending_insights'),
+    path('timeseries/', views.timeseries, name='expense_timeseries'),
+    path('cache/stats/', views.cache_stats, name='expense_cache_stats'),
 ]
\ No newline at end of file
@@ -1,201 +1,160 @@
-from datetime import timedelta
-from django.db.models import Sum, Count, Avg
-from django.utils import timezone
+import io
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from . import cache as expense_cache, monthly_spend, writes
+from .conditional import expense_etag, expense_last_modified, profile_state
+from .export import EXPORT_FORMATS, export_rows
 from .filters import ExpenseFilter
+from .importers import InvalidImportFile, import_csv
 from .models import Expenses
-from .serializers import ExpensesSerializer
+from .pagination import ExpensesCursorPagination, ExpensesPagination
+from .serializers import read_queryset, serialize_rows
+from .throttling import ExpenseRateThrottle, SummaryRateThrottle
+from .services import build_insights, build_summary, insights_rows, streak_query
+from .timeseries import InvalidSeries, build_series
 
 
-class ExpensesPagination(PageNumberPagination):
-    page_size = 5
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def use_cursor_pagination(request):
+    return request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def list_expenses(request):
-    expenses = Expenses.objects.filter(user=request.user).select_related('category').order_by('-date')
-    expense_filter = ExpenseFilter(request.GET, queryset=expenses)
-    filtered_expenses = expense_filter.qs
+def is_first_page(request):
+    # Only the first page is cached; deeper pages are rarely requested twice
+    return request.GET.get('page', '1') == '1' and not request.GET.get('cursor')
+
+
+def filtered_expenses(request):
+    expenses = Expenses.objects.filter(user=request.user).order_by('-date')
+    return read_queryset(ExpenseFilter(request.GET, queryset=expenses, user=request.user).qs)
+
+
+def _list_expenses_data(request):
+    # The async list view runs the same steps with the async ORM
+    filtered = filtered_expenses(request)
     
-    if not filtered_expenses.exists():
-        return Response({'message': 'No expenses found.'})
+    if use_cursor_pagination(request):
+        # Keyset pages skip the COUNT(*)
+        paginator = ExpensesCursorPagination()
+        page = paginator.paginate_queryset(filtered, request)
+        return paginator.get_paginated_response(serialize_rows(page)).data
     
-    paginator = ExpensesPagination()
-    paginated_expenses = paginator.paginate_queryset(filtered_expenses, request)
+    count = filtered.count()
+    if not count:
+        return {'message': 'No expenses found.'}
     
-    if paginated_expenses is not None:
-        serializer = ExpensesSerializer(paginated_expenses, many=True)
-        return paginator.get_paginated_response(serializer.data)
+    paginator = ExpensesPagination()
+    page = list(paginator.page_queryset(filtered, request, count))
+    return paginator.get_paginated_response(serialize_rows(page)).data
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=expense_etag('list'), last_modified_func=expense_last_modified)
+def list_expenses(request):
+    if not is_first_page(request):
+        return Response(_list_expenses_data(request))
+    return Response(expense_cache.get_or_compute(request, 'list', lambda: _list_expenses_data(request)))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ExpenseRateThrottle])
+def import_expenses(request):
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload a CSV file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = ExpensesSerializer(filtered_expenses, many=True)
-    return Response(serializer.data)
+    date_format = request.data.get('date_format', '%Y-%m-%d')
+    try:
+        report = import_csv(request.user, io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''),
+                            date_format=date_format)
+    except (InvalidImportFile, UnicodeDecodeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict(), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_expenses(request):
+    output = request.GET.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        return Response({'error': f"Unsupported output '{output}'. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    expense_filter = ExpenseFilter(request.GET, queryset=Expenses.objects.filter(user=request.user), user=request.user)
+    stream, content_type, extension = EXPORT_FORMATS[output]
+    response = StreamingHttpResponse(stream(export_rows(expense_filter.qs)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="expenses.{extension}"'
+    return response
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ExpenseRateThrottle])
 def create_expense(request):
-    serializer = ExpensesSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save(user=request.user)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    payload, code = writes.create(request.user, request.data)
+    return Response(payload, status=code)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ExpenseRateThrottle])
+def bulk_create_expenses(request):
+    payload, code = writes.bulk_create(request.user, request.data)
+    return Response(payload, status=code)
 
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ExpenseRateThrottle])
 def update_expense(request, pk):
-    try:
-        expense = Expenses.objects.select_related('category').get(pk=pk, user=request.user)
-    except Expenses.DoesNotExist:
-        return Response({'error': 'Expense not found.'}, status=status.HTTP_404_NOT_FOUND)
-    
-    serializer = ExpensesSerializer(expense, data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response(serializer.data)
-    return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    payload, code = writes.update(request.user, pk, request.data)
+    return Response(payload, status=code)
 
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ExpenseRateThrottle])
 def delete_expense(request, pk):
-    try:
-        expense = Expenses.objects.get(pk=pk, user=request.user)
-    except Expenses.DoesNotExist:
-        return Response({'error': 'Expense not found.'}, status=status.HTTP_404_NOT_FOUND)
-    
-    expense.delete()
-    return Response(status=status.HTTP_204_NO_CONTENT)
+    payload, code = writes.delete(request.user, pk)
+    return Response(payload, status=code)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([SummaryRateThrottle])
+@condition(etag_func=expense_etag('summary'), last_modified_func=expense_last_modified)
 def summary(request):
-    expenses = Expenses.objects.filter(user=request.user).select_related('category')
-    expense_filter = ExpenseFilter(request.GET, queryset=expenses)
-    filtered_expenses = expense_filter.qs
-    
-    totals = filtered_expenses.aggregate(
-        total_amount=Sum('amount'),
-        total_count=Count('id'),
-        average_amount=Avg('amount')
-    )
-    
-    categories = filtered_expenses.values('category__name').annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')
-    
-    total_amount = totals['total_amount'] or 0
-    category_breakdown = []
-    
-    for cat in categories:
-        percentage = (cat['total'] / total_amount * 100) if total_amount > 0 else 0
-        category_breakdown.append({
-            'name': cat['category__name'],
-            'total': cat['total'],
-            'count': cat['count'],
-            'percentage': round(percentage, 2)
-        })
-    
-    try:
-        monthly_budget = request.user.userprofile.monthly_budget
-    except AttributeError:
-        monthly_budget = 0
-    
-    budget_status = {
-        'monthly_budget': float(monthly_budget),
-        'spent': float(total_amount),
-        'remaining': float(monthly_budget) - float(total_amount),
-        'percentage_used': round((float(total_amount) / float(monthly_budget) * 100), 2) if monthly_budget > 0 else 0
-    }
-    
-    current_month = timezone.now().date().replace(day=1)
-    last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    current_month_expenses = filtered_expenses.filter(date__gte=current_month)
-    current_month_total = current_month_expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    last_month_expenses = filtered_expenses.filter(date__gte=last_month, date__lt=current_month)
-    last_month_total = last_month_expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    if last_month_total > 0:
-        month_change = ((current_month_total - last_month_total) / last_month_total) * 100
-    else:
-        month_change = 100 if current_month_total > 0 else 0
-    
-    top_category = current_month_expenses.values('category__name').annotate(
-        total=Sum('amount')
-    ).order_by('-total').first()
-    
-    spending_insights = {
-        'current_month_spending': current_month_total,
-        'last_month_spending': last_month_total,
-        'month_over_month_change': round(month_change, 2),
-        'trend': 'increasing' if month_change > 0 else 'decreasing' if month_change < 0 else 'stable',
-        'top_category_this_month': top_category['category__name'] if top_category else None,
-        'top_category_amount': top_category['total'] if top_category else 0
-    }
-    
-    return Response({
-        'summary': {
-            'total_amount': total_amount,
-            'total_count': totals['total_count'] or 0,
-            'average_amount': round(totals['average_amount'] or 0, 2)
-        },
-        'category_breakdown': category_breakdown,
-        'budget_status': budget_status,
-        'spending_insights': spending_insights,
-        'period': request.GET.get('period', 'all_time')
-    })
+    state = profile_state(request)
+    month_spent = monthly_spend.read(request.user.id, state.month_start, state.month_spent, state.month_count).spent
+    return Response(expense_cache.get_or_compute(
+        request, 'summary', lambda: build_summary(request.user, request.GET, state.monthly_budget, month_spent)
+    ))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def insights(request):
+    def compute():
+        return build_insights(list(insights_rows(request.user)), streak_query(request.user).first())
+    return Response(expense_cache.get_or_compute(request, 'insights', compute))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def timeseries(request):
     try:
-        expenses = Expenses.objects.filter(user=request.user)
-        last_7_days = timezone.now().date() - timedelta(days=7)
-        weekly_expenses = expenses.filter(date__gte=last_7_days)
-        weekly_total = weekly_expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-        daily_average = weekly_total / 7
-        
-        spending_days = set(weekly_expenses.values_list('date', flat=True))
-        streak = 0
-        current_date = timezone.now().date()
-        
-        while current_date in spending_days and streak < 30:
-            streak += 1
-            current_date -= timedelta(days=1)
-        
-        warnings = []
-        if weekly_total > 100:
-            warnings.append("High spending this week")
-        
-        return Response({
-            'weekly_spending': float(weekly_total),
-            'daily_average': round(daily_average, 2),
-            'spending_streak_days': streak,
-            'warnings': warnings,
-            'insights': [
-                f"You've spent money {streak} days in a row" if streak > 1 else "No recent spending streak",
-                f"Your daily average this week is ${daily_average:.2f}",
-                f"Weekly spending: ${weekly_total}"
-            ]
-        })
-    except (ValueError, TypeError, AttributeError):
-        return Response({
-            'weekly_spending': 0,
-            'daily_average': 0,
-            'spending_streak_days': 0,
-            'warnings': [],
-            'insights': ["No spending data available"]
-        })
\ No newline at end of file
+        return Response(build_series(request.user, request.GET, profile_state(request).closed_buckets_modified_at))
+    except InvalidSeries as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(expense_cache.get_stats())
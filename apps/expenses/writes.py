@@ -0,0 +1,123 @@
+"""
+Expense write operations shared by the DRF views and the async views.
+
+Each function validates with ExpensesSerializer, writes inside a transaction
+that also sends ``expenses_changed``, and returns ``(payload, status_code)``.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+
+from apps.categories import registry
+from apps.categories.models import Category
+from .models import Expenses
+from .serializers import CategoryField, ExpensesSerializer
+from .signals import expenses_changed, snapshot
+
+NOT_FOUND = ({'error': 'Expense not found.'}, status.HTTP_404_NOT_FOUND)
+
+
+
+def missing_categories(category_ids):
+    # Validation reads the category registry, which can be behind a delete made on another
+    # worker; the insert's foreign key check catches those, and this finds which ids they were
+    registry.invalidate()
+    return set(category_ids) - set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+
+
+def category_error(pk):
+    return {'category': [CategoryField.default_error_messages['does_not_exist'].format(pk_value=pk)]}
+
+
+def create(user, data):
+    serializer = ExpensesSerializer(data=data)
+    if not serializer.is_valid():
+        return {'error': serializer.errors}, status.HTTP_400_BAD_REQUEST
+    try:
+        with transaction.atomic():
+            expense = serializer.save(user=user)
+            expenses_changed.send(sender=Expenses, user_id=user.id, added=[expense], created=True)
+    except IntegrityError:
+        category_id = serializer.validated_data['category'].pk
+        if not missing_categories([category_id]):
+            raise
+        return {'error': category_error(category_id)}, status.HTTP_400_BAD_REQUEST
+    return serializer.data, status.HTTP_201_CREATED
+
+
+def _insert(user, expenses):
+    with transaction.atomic():
+        created = Expenses.objects.bulk_create(expenses, batch_size=settings.EXPENSE_BULK_BATCH_SIZE)
+        expenses_changed.send(sender=Expenses, user_id=user.id, added=created, created=True)
+    return created
+
+
+def bulk_create(user, rows):
+    if not isinstance(rows, list) or not rows:
+        return {'error': 'Expected a non-empty list of expenses.'}, status.HTTP_400_BAD_REQUEST
+    if len(rows) > settings.EXPENSE_BULK_MAX_ROWS:
+        return {'error': f'At most {settings.EXPENSE_BULK_MAX_ROWS} expenses per request.'}, status.HTTP_400_BAD_REQUEST
+
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = ExpensesSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, Expenses(user=user, **serializer.validated_data)))
+        else:
+            errors.append({'index': index, 'error': serializer.errors})
+
+    created = []
+    if valid:
+        try:
+            created = _insert(user, [expense for _, expense in valid])
+        except IntegrityError:
+            missing = missing_categories({expense.category_id for _, expense in valid})
+            if not missing:
+                raise
+            errors.extend({'index': index, 'error': category_error(expense.category_id)}
+                          for index, expense in valid if expense.category_id in missing)
+            errors.sort(key=lambda error: error['index'])
+            # Retry once without them; the rolled-back insert may have assigned ids
+            retry = [expense for _, expense in valid if expense.category_id not in missing]
+            for expense in retry:
+                expense.pk, expense._state.adding = None, True
+            created = _insert(user, retry) if retry else []
+
+    return {
+        'created': ExpensesSerializer(created, many=True).data,
+        'errors': errors
+    }, status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+
+
+def update(user, pk, data):
+    try:
+        expense = Expenses.objects.select_related('category').get(pk=pk, user=user)
+    except Expenses.DoesNotExist:
+        return NOT_FOUND
+
+    previous = snapshot(expense)
+    serializer = ExpensesSerializer(expense, data=data)
+    if not serializer.is_valid():
+        return {'error': serializer.errors}, status.HTTP_400_BAD_REQUEST
+    try:
+        with transaction.atomic():
+            serializer.save()
+            expenses_changed.send(sender=Expenses, user_id=user.id, added=[expense], removed=[previous])
+    except IntegrityError:
+        category_id = serializer.validated_data['category'].pk
+        if not missing_categories([category_id]):
+            raise
+        return {'error': category_error(category_id)}, status.HTTP_400_BAD_REQUEST
+    return serializer.data, status.HTTP_200_OK
+
+
+def delete(user, pk):
+    try:
+        expense = Expenses.objects.get(pk=pk, user=user)
+    except Expenses.DoesNotExist:
+        return NOT_FOUND
+
+    with transaction.atomic():
+        expense.delete()
+        expenses_changed.send(sender=Expenses, user_id=user.id, removed=[expense])
+    return None, status.HTTP_204_NO_CONTENT
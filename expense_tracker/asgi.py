@@ -7,10 +7,16 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import logging
 import os
+import time
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings')
 
+started = time.perf_counter()
 application = get_asgi_application()
+
+# Settings, app registry and middleware setup; no database connection is opened here
+logging.getLogger(__name__).info('ASGI application loaded in %.0f ms', (time.perf_counter() - started) * 1000)
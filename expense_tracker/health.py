@@ -0,0 +1,38 @@
+"""
+Liveness and readiness probes for the load balancer.
+
+/health/live/ never touches the database. /health/ready/ checks that the
+database answers and that no migrations are pending; once the schema has been
+seen up to date, later probes in the same process only run the connection check.
+"""
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+_schema_ready = False
+
+
+def pending_migrations():
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [f'{migration.app_label}.{migration.name}' for migration, backwards in plan]
+
+
+def live(request):
+    return JsonResponse({'status': 'ok'})
+
+
+def ready(request):
+    global _schema_ready
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not _schema_ready:
+            pending = pending_migrations()
+            if pending:
+                return JsonResponse({'status': 'unavailable', 'error': 'Pending migrations', 'pending': pending},
+                                    status=503)
+            _schema_ready = True
+    except DatabaseError as e:
+        return JsonResponse({'status': 'unavailable', 'error': f'Database unavailable: {e}'}, status=503)
+    return JsonResponse({'status': 'ok'})
@@ -0,0 +1,287 @@
+"""
+Per-request instrumentation.
+
+MetricsMiddleware times each request, counts its queries and DB time, adds a
+Server-Timing header and folds the numbers into histograms labelled by URL
+name. Each worker process keeps its histograms in memory and periodically
+writes them to its own file in METRICS_DIR; the /metrics view merges every
+live worker's file into one Prometheus text exposition, and deletes the files
+of workers that have exited. Streamed responses are recorded once their last
+chunk has been sent, with the bytes actually streamed.
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time spent handling the request', DURATION_BUCKETS),
+    'http_view_duration_seconds': ('Time spent in the view, including DB time', DURATION_BUCKETS),
+    'http_db_duration_seconds': ('Time spent executing SQL', DURATION_BUCKETS),
+    'http_db_queries': ('SQL queries executed per request', QUERY_BUCKETS),
+    'http_response_size_bytes': ('Response body size', SIZE_BUCKETS),
+}
+
+_lock = threading.Lock()
+# (metric, view, method) -> [bucket counts..., +Inf count, sum]
+_histograms = {}
+# (view, method, status) -> count
+_requests = {}
+_last_flush = 0.0
+# Unique per process, so a restarted worker never overwrites a previous worker's totals;
+# the pid prefix tells collect() whether the worker is still running
+_worker_id = f'{os.getpid()}-{time.time_ns()}'
+
+
+def observe(metric, view, method, value):
+    buckets = HISTOGRAMS[metric][1]
+    series = _histograms.setdefault((metric, view, method), [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            series[i] += 1
+    series[-2] += 1
+    series[-1] += value
+
+
+def record(view, method, status, seconds, view_seconds, db_seconds, queries, size):
+    global _last_flush
+    with _lock:
+        observe('http_request_duration_seconds', view, method, seconds)
+        observe('http_view_duration_seconds', view, method, view_seconds)
+        observe('http_db_duration_seconds', view, method, db_seconds)
+        observe('http_db_queries', view, method, queries)
+        if size is not None:
+            observe('http_response_size_bytes', view, method, size)
+        key = (view, method, str(status))
+        _requests[key] = _requests.get(key, 0) + 1
+
+        now = time.monotonic()
+        if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            _last_flush = now
+            _flush()
+
+
+def _flush():
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = os.path.join(settings.METRICS_DIR, f'{_worker_id}.json')
+    data = {
+        'histograms': [[*key, series] for key, series in _histograms.items()],
+        'requests': [[*key, count] for key, count in _requests.items()],
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def flush():
+    with _lock:
+        _flush()
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def collect():
+    """Merge the files written by running workers, deleting those of exited ones."""
+    histograms, requests = {}, {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        pid = os.path.basename(path).split('-', 1)[0]
+        if not pid.isdigit():
+            continue
+        if not _is_running(int(pid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for metric, view, method, series in data['histograms']:
+            if metric not in HISTOGRAMS or len(series) != len(HISTOGRAMS[metric][1]) + 2:
+                continue
+            merged = histograms.setdefault((metric, view, method), [0] * len(series))
+            for i, value in enumerate(series):
+                merged[i] += value
+        for view, method, status, count in data['requests']:
+            requests[(view, method, status)] = requests.get((view, method, status), 0) + count
+    return histograms, requests
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render(histograms, requests):
+    lines = [
+        '# HELP http_requests_total Requests handled',
+        '# TYPE http_requests_total counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f'http_requests_total{{{_labels(view=view, method=method, status=status)}}} {count}')
+
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, view, method), series in sorted(histograms.items()):
+            if name != metric:
+                continue
+            labels = _labels(view=view, method=method)
+            for bound, count in zip(buckets, series):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series[-2]}')
+            lines.append(f'{metric}_sum{{{labels}}} {round(series[-1], 6)}')
+            lines.append(f'{metric}_count{{{labels}}} {series[-2]}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryTimer:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def _add_wrapper(timer):
+    connection.execute_wrappers.append(timer)
+
+
+def _remove_wrapper(timer):
+    connection.execute_wrappers.remove(timer)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Keep process_view async too, or Django would run it through sync_to_async
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        request._view_started = None
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self.finish(request, response, started, timer)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        request._view_started = None
+        timer = QueryTimer()
+        # The async ORM and sync views run their queries on the request's thread-sensitive
+        # worker thread, whose connection is not the event loop's
+        await sync_to_async(_add_wrapper, thread_sensitive=True)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper, thread_sensitive=True)(timer)
+        return self.finish(request, response, started, timer)
+
+    def finish(self, request, response, started, timer):
+        finished = time.perf_counter()
+        total = finished - started
+        view_seconds = finished - request._view_started if request._view_started else 0.0
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timer.seconds * 1000:.2f};desc="{timer.queries} queries"',
+            f'view;dur={view_seconds * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+
+        def done(size):
+            seconds = time.perf_counter() - started
+            record(view, request.method, response.status_code, seconds, view_seconds, timer.seconds, timer.queries, size)
+
+        if not response.streaming:
+            done(len(response.content))
+        elif response.is_async:
+            response.streaming_content = self.acount_stream(response.streaming_content, done)
+        else:
+            response.streaming_content = self.count_stream(response.streaming_content, timer, done)
+        return response
+
+    def count_stream(self, content, timer, done):
+        # Exports run their query while streaming, so keep counting queries until the end
+        size = 0
+        try:
+            with connection.execute_wrapper(timer):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            done(size)
+
+    async def acount_stream(self, content, done):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            done(size)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+
+def _can_scrape(request):
+    # The METRICS_TOKEN bearer token, or else a staff user authenticated like the API
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return False
+    return user.is_staff
+
+
+def metrics_view(request):
+    if not _can_scrape(request):
+        return HttpResponse(status=401)
+    flush()
+    return HttpResponse(render(*collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -67,8 +68,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expense_tracker.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'expense_tracker.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +98,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'expense_tracker.wsgi.application'
 
+TEST_RUNNER = 'expense_tracker.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -155,7 +159,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -181,11 +185,39 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    # Revocation lives in apps.authentication.revocation, not the token_blacklist tables
+    'BLACKLIST_AFTER_ROTATION': True,
+    'AUTH_TOKEN_CLASSES': ('apps.authentication.revocation.RevocableAccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.authentication.serializers.RevocableTokenRefreshSerializer',
 }
 
 # Expense Tracker Configuration
-EXPENSE_MAX_STREAK_DAYS = int(os.environ.get('EXPENSE_MAX_STREAK_DAYS', 30))
 EXPENSE_MAX_PAGE_SIZE = int(os.environ.get('EXPENSE_MAX_PAGE_SIZE', 100))
+EXPENSE_CACHE_TIMEOUT = int(os.environ.get('EXPENSE_CACHE_TIMEOUT', 300))
+EXPENSE_SERIES_CACHE_TIMEOUT = int(os.environ.get('EXPENSE_SERIES_CACHE_TIMEOUT', 60 * 60 * 24))
+EXPENSE_BULK_MAX_ROWS = int(os.environ.get('EXPENSE_BULK_MAX_ROWS', 1000))
+EXPENSE_BULK_BATCH_SIZE = int(os.environ.get('EXPENSE_BULK_BATCH_SIZE', 500))
+CATEGORY_CACHE_TTL = int(os.environ.get('CATEGORY_CACHE_TTL', 60))
+# Authenticated users cached per worker; changes made through another worker show up within the TTL
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 30))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+USER_PROVISION_MAX_ROWS = int(os.environ.get('USER_PROVISION_MAX_ROWS', 1000))
+USER_PROVISION_BATCH_SIZE = int(os.environ.get('USER_PROVISION_BATCH_SIZE', 500))
+USER_PROVISION_HASH_WORKERS = int(os.environ.get('USER_PROVISION_HASH_WORKERS', 4))
+
+# Metrics: each worker writes its histograms to METRICS_DIR at most every
+# METRICS_FLUSH_INTERVAL seconds. /metrics takes METRICS_TOKEN as a bearer token, or a staff user
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'expense_tracker_metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Token-bucket throttle state, shared by every worker on the host. The test runner
+# (expense_tracker.test_runner) points this and the revocation store at a throwaway directory.
+THROTTLE_STORE_PATH = os.environ.get('THROTTLE_STORE_PATH', str(BASE_DIR / 'throttle.sqlite3'))
+# Revoked token ids, shared by every worker on the host; each worker re-reads
+# new revocations at most once per TOKEN_REVOCATION_SYNC_INTERVAL seconds
+TOKEN_REVOCATION_STORE_PATH = os.environ.get('TOKEN_REVOCATION_STORE_PATH', str(BASE_DIR / 'revoked.sqlite3'))
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', 1))
 
 # Caching
 CACHES = {
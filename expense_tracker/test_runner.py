@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests against throwaway throttle and revocation stores, so buckets
+    and revoked tokens don't carry over between runs or into the real files.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.store_directory = tempfile.TemporaryDirectory()
+        self.store_settings = override_settings(
+            THROTTLE_STORE_PATH=os.path.join(self.store_directory.name, 'throttle.sqlite3'),
+            TOKEN_REVOCATION_STORE_PATH=os.path.join(self.store_directory.name, 'revoked.sqlite3'),
+        )
+        self.store_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.store_settings.disable()
+        self.store_directory.cleanup()
+        super().teardown_test_environment(**kwargs)
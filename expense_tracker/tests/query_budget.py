@@ -0,0 +1,83 @@
+"""
+Query-budget assertions for API tests.
+
+QueryBudgetMixin records every SQL statement a request executes. It fails a
+test when an endpoint goes over its declared query budget, or when the number
+of queries grows with the number of rows returned (an N+1). Failures list the
+offending statements grouped by normalized SQL, most frequent first.
+"""
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LISTS = re.compile(r'\bIN \((?:\s*(?:\?|%s|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_VALUES = re.compile(r'VALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    # Literals, IN lists and multi-row VALUES collapse so repeats of one statement group together
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+    sql = _VALUES.sub(r'VALUES \1, ...', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def group_queries(queries):
+    return Counter(normalize_sql(query['sql']) for query in queries)
+
+
+def format_groups(groups, limit=10):
+    lines = [f'{count:>4} x {sql}' for sql, count in groups.most_common(limit)]
+    if len(groups) > limit:
+        lines.append(f'     ... and {len(groups) - limit} more statements')
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    def capture_queries(self, method, url, data=None, **extra):
+        """Send a request with a cold cache and return (response, captured queries)."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url, data, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, captured.captured_queries
+
+    def assertQueryBudget(self, budget, method, url, data=None, **extra):
+        response, queries = self.capture_queries(method, url, data, **extra)
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url} returned {response.status_code}')
+        if len(queries) > budget:
+            self.fail(f'{method.upper()} {url} executed {len(queries)} queries, budget is {budget}:\n'
+                      f'{format_groups(group_queries(queries))}')
+        return response
+
+    def assertNoNPlusOne(self, request, seed, small=2, large=20):
+        """
+        Call ``seed(count)`` then ``request()`` for a small and a large count of
+        rows; ``request`` returns (method, url, data, extra). The query count
+        must be the same for both.
+        """
+        counts = []
+        for rows in (small, large):
+            seed(rows)
+            method, url, data, extra = request(rows)
+            response, queries = self.capture_queries(method, url, data, **extra)
+            self.assertLess(response.status_code, 400, f'{method.upper()} {url} returned {response.status_code}')
+            counts.append((rows, group_queries(queries)))
+
+        (small_rows, small_groups), (large_rows, large_groups) = counts
+        if sum(large_groups.values()) > sum(small_groups.values()):
+            grown = Counter({
+                sql: count - small_groups[sql]
+                for sql, count in large_groups.items() if count > small_groups[sql]
+            })
+            self.fail(f'{method.upper()} {url}: queries grew from {sum(small_groups.values())} at {small_rows} rows '
+                      f'to {sum(large_groups.values())} at {large_rows} rows. Statements that grew:\n'
+                      f'{format_groups(grown)}')
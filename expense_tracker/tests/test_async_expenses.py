@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.categories.models import Category
+from apps.expenses.models import Expenses
+from apps.expenses.signals import expenses_changed
+
+
+class AsyncExpenseTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='asyncuser', password='testpass123')
+        self.category = Category.objects.create(name='Async Category')
+        expenses = Expenses.objects.bulk_create([
+            Expenses(user=self.user, amount=i + 1, description=f'Expense {i}', category=self.category,
+                     tags='work' if i % 2 else '', date=f'2024-01-{i + 1:02d}')
+            for i in range(7)
+        ])
+        expenses_changed.send(sender=Expenses, user_id=self.user.id, added=expenses)
+        self.token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_requires_token(self):
+        self.client.credentials()
+        response = self.client.get(reverse('async_list_expenses'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        response = self.client.get(reverse('async_expense_summary'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reads_match_sync_views(self):
+        for params in [{}, {'page': 2}, {'tags': 'work'}, {'pagination': 'cursor', 'page_size': 3}]:
+            sync_data = self.client.get(reverse('list_expenses'), params).json()
+            async_data = self.client.get(reverse('async_list_expenses'), params).json()
+            self.assertEqual(async_data['results'], sync_data['results'])
+            self.assertEqual(async_data.get('count'), sync_data.get('count'))
+        for name in ['expense_summary', 'spending_insights']:
+            cache.clear()
+            sync_data = self.client.get(reverse(name), {'category': self.category.id}).json()
+            cache.clear()
+            async_data = self.client.get(reverse(f'async_{name}'), {'category': self.category.id}).json()
+            self.assertEqual(async_data, sync_data)
+
+    def test_invalid_page(self):
+        response = self.client.get(reverse('async_list_expenses'), {'page': 99})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes(self):
+        data = {'amount': '9.99', 'description': 'Async lunch', 'category': self.category.id, 'tags': 'food'}
+        response = self.client.post(reverse('async_create_expense'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        expense_id = response.json()['id']
+
+        response = self.client.put(reverse('async_update_expense', args=[expense_id]),
+                                   {**data, 'amount': '19.99'}, format='json')
+        self.assertEqual(response.json()['amount'], '19.99')
+
+        response = self.client.post(reverse('async_bulk_create_expenses'), [data, {'amount': 'x'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()['errors']), 1)
+
+        response = self.client.delete(reverse('async_delete_expense', args=[expense_id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.delete(reverse('async_delete_expense', args=[expense_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Expenses.objects.filter(user=self.user).count(), 8)
+
+    async def test_summary_over_asgi(self):
+        response = await AsyncClient().get(reverse('async_expense_summary'),
+                                           headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['summary']['total_count'], 7)
+        self.assertEqual(response.json()['tag_breakdown'][0]['count'], 3)
+        self.assertIn('Server-Timing', response)
@@ -1,7 +1,18 @@
+import os
+import tempfile
+import time
+from decimal import Decimal
+
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User 
 from rest_framework import status
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.authentication import revocation, user_cache
+from apps.authentication.models import UserProfile
+from apps.categories.models import Category
 
 
 class AuthenticationTests(APITestCase):
@@ -90,3 +101,105 @@ class AuthenticationTests(APITestCase):
         self.assertEqual(response.data['message'], 'This is a protected endpoint')
 
 
+    def test_budget_for_user_without_profile(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('budget'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['remaining']), Decimal('0.00'))
+
+
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user(username='cacheduser', password='testpass123')
+        self.category = Category.objects.create(name='Cached Category')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_cached_user_needs_no_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('protected')).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('protected')).status_code, status.HTTP_200_OK)
+
+    def test_deactivation_evicts_user(self):
+        self.client.get(reverse('protected'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('protected')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_requests_get_their_own_copy(self):
+        self.client.get(reverse('protected'))
+        user_cache.get(self.user.id).first_name = 'Changed'
+        self.assertEqual(user_cache.get(self.user.id).first_name, '')
+
+    def test_profile_columns_are_read_fresh(self):
+        self.client.put(reverse('budget'), {'monthly_budget': '300.00'}, format='json')
+        self.client.post(reverse('create_expense'), {
+            'amount': 40, 'description': 'Cached', 'category': self.category.id,
+        }, format='json')
+        self.client.get(reverse('protected'))
+        # The cached user costs nothing; the profile row is the one query
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('budget'))
+        self.assertEqual(Decimal(response.data['remaining']), Decimal('260.00'))
+
+        # As written by another worker: update() sends no signals, so nothing is evicted here
+        UserProfile.objects.filter(user=self.user).update(monthly_budget=Decimal('500.00'), updated_at=timezone.now())
+        self.assertEqual(Decimal(self.client.get(reverse('budget')).data['remaining']), Decimal('460.00'))
+        summary = self.client.get(reverse('expense_summary'))
+        self.assertEqual(Decimal(str(summary.data['budget_status']['remaining'])), Decimal('460.00'))
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username='revokeuser', password='testpass123')
+        response = self.client.post(reverse('login'), {'username': 'revokeuser', 'password': 'testpass123'}, format='json')
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+
+    def refresh_token(self, refresh):
+        return self.client.post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.post(reverse('logout'), {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('protected')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_rejects_another_users_refresh_token(self):
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.post(reverse('logout'), {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_200_OK)
+
+    def test_rotation_revokes_the_old_refresh_token(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh_token(response.data['refresh']).status_code, status.HTTP_200_OK)
+
+    def test_refresh_checks_the_shared_store(self):
+        # Revoked by another worker since this worker's last sync
+        revocations = revocation.get_revocations()
+        revocations.sync()
+        token = RefreshToken(self.refresh)
+        revocations.store.add(token['jti'], token['exp'])
+        self.assertFalse(token['jti'] in revocations._revoked)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocations_reach_other_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'revoked.sqlite3')
+            first = revocation.RevocationList(revocation.SQLiteRevocationStore(path), sync_interval=0)
+            second = revocation.RevocationList(revocation.SQLiteRevocationStore(path), sync_interval=0)
+            self.assertFalse(second.is_revoked('a'))
+            first.revoke('a', time.time() + 60)
+            first.revoke('b', time.time() + 60)
+            self.assertTrue(second.is_revoked('a'))
+            self.assertTrue(second.is_revoked('b'))
+            # Expired ids are pruned from the shared store
+            first.store.add('c', time.time() + 60, now=time.time() + 120)
+            self.assertEqual([row[1] for row in first.store.since(0)], ['c'])
@@ -56,6 +56,26 @@ class CategoryAPITestCase(APITestCase):
         # Categories might be read-only, so expect method not allowed
         self.assertIn(response.status_code, [status.HTTP_204_NO_CONTENT, status.HTTP_405_METHOD_NOT_ALLOWED])
     
+    def test_list_served_from_registry(self):
+        url = reverse('category-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Category.objects.create(name='Fresh Category')
+        names = [cat['name'] for cat in self.client.get(url).data]
+        self.assertIn('Fresh Category', names)
+    
+    def test_conditional_get(self):
+        url = reverse('category-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Category.objects.create(name='New Category')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
     def test_unauthorized_access(self):
         """Test that unauthenticated users cannot access categories"""
         self.client.force_authenticate(user=None)  # Remove authentication
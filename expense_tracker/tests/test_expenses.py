@@ -1,9 +1,28 @@
-from rest_framework.test import APITestCase
+import csv
+import json
+import os
+import random
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework import status
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from apps.expenses.models import Expenses
+from apps.authentication.models import UserProfile
+from apps.expenses.models import DailyRollup, ExpenseTag, Expenses, MonthlyStatement, SpendingRun, SpendingStreak
+from apps.categories import registry
 from apps.categories.models import Category
+from apps.expenses.serializers import ExpensesSerializer, read_queryset, serialize_rows
+from apps.expenses.signals import expenses_changed
 
 
 class ExpenseTests(APITestCase):
@@ -62,8 +81,833 @@ class ExpenseTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_expense_validates_category_without_query(self):
+        self.client.get(reverse('category-list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.test_create_expense()
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "categories_category"' in q['sql']])
+
     def test_create_expense_invalid_category(self):
         url = reverse('create_expense')
         data = {'amount': 100, 'category': 999}
         response = self.client.post(url, data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DeletedCategoryTests(APITransactionTestCase):
+    # Commits for real, so the foreign key checks run when the write's transaction ends
+    def setUp(self):
+        self.user = User.objects.create_user(username='staleuser', password='testpass123')
+        self.category = Category.objects.create(name='Kept Category')
+        self.client.force_authenticate(user=self.user)
+
+    def stale_category(self):
+        # Deleted by "another worker": no signals, so this worker's registry still has it
+        category = Category.objects.create(name='Deleted Category')
+        registry.current()
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM categories_category WHERE id = %s', [category.id])
+        return category
+
+    def expense(self, category):
+        return {'amount': 10, 'description': 'Stale', 'category': category.id}
+
+    def test_writes_reject_a_category_deleted_behind_the_registry(self):
+        response = self.client.post(reverse('create_expense'), self.expense(self.stale_category()), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', response.data['error'])
+
+        expense_id = self.client.post(reverse('create_expense'), self.expense(self.category), format='json').data['id']
+        response = self.client.put(reverse('update_expense', args=[expense_id]),
+                                   self.expense(self.stale_category()), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', response.data['error'])
+
+        rows = [self.expense(self.stale_category()), self.expense(self.category)]
+        response = self.client.post(reverse('bulk_create_expenses'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0])
+        self.assertEqual(Expenses.objects.filter(user=self.user).count(), 2)
+
+
+class ExpenseRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rollupuser', password='testpass123')
+        self.category = Category.objects.create(name='Rollup Category')
+        self.other_category = Category.objects.create(name='Other Category')
+        self.client.force_authenticate(user=self.user)
+
+    def create_expense(self, amount, category):
+        url = reverse('create_expense')
+        data = {'amount': amount, 'description': 'Rollup expense', 'category': category.id}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_writes_keep_rollup_in_sync(self):
+        first = self.create_expense(100, self.category)
+        second = self.create_expense(50, self.category)
+        rollup = DailyRollup.objects.get(user=self.user, category=self.category)
+        self.assertEqual((rollup.total, rollup.count), (150, 2))
+
+        url = reverse('update_expense', args=[first])
+        data = {'amount': 30, 'description': 'Moved', 'category': self.other_category.id}
+        self.assertEqual(self.client.put(url, data, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(DailyRollup.objects.get(user=self.user, category=self.category).total, 50)
+        self.assertEqual(DailyRollup.objects.get(user=self.user, category=self.other_category).total, 30)
+
+        self.client.delete(reverse('delete_expense', args=[first]))
+        self.assertFalse(DailyRollup.objects.filter(user=self.user, category=self.other_category).exists())
+
+        url = reverse('update_expense', args=[second])
+        data = {'amount': 70, 'description': 'Pricier', 'category': self.category.id}
+        self.assertEqual(self.client.put(url, data, format='json').status_code, status.HTTP_200_OK)
+        rollup = DailyRollup.objects.get(user=self.user, category=self.category)
+        self.assertEqual((rollup.total, rollup.count), (70, 1))
+
+    def test_deleting_a_category_updates_derived_data(self):
+        self.create_expense(100, self.category)
+        self.create_expense(50, self.other_category)
+        backdated = {'amount': 20, 'description': 'Backdated', 'category': self.other_category.id,
+                     'date': (timezone.localdate() - timedelta(days=1)).isoformat()}
+        self.client.post(reverse('create_expense'), backdated, format='json')
+        watermark = UserProfile.objects.get(user=self.user).closed_buckets_modified_at
+
+        response = self.client.delete(reverse('category-detail', args=[self.other_category.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(DailyRollup.objects.filter(category_id=self.other_category.id).exists())
+        self.assertEqual(list(SpendingRun.objects.filter(user=self.user).values_list('days', flat=True)), [1])
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertGreater(profile.closed_buckets_modified_at, watermark)
+        self.assertEqual(self.client.get(reverse('expense_summary')).data['summary']['total_amount'], 100)
+        self.assertEqual((profile.month_spent, profile.month_count), (100, 1))
+
+    def test_summary_reads_rollup(self):
+        self.create_expense(100, self.category)
+        self.create_expense(50, self.other_category)
+        response = self.client.get(reverse('expense_summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_amount'], 150)
+        self.assertEqual(response.data['summary']['total_count'], 2)
+        self.assertEqual(response.data['summary']['average_amount'], 75)
+        self.assertEqual(response.data['category_breakdown'][0]['name'], 'Rollup Category')
+
+        response = self.client.get(reverse('expense_summary') + f'?category={self.other_category.id}')
+        self.assertEqual(response.data['summary']['total_amount'], 50)
+
+    def test_rebuild_rollups_command(self):
+        Expenses.objects.create(user=self.user, amount=20, description='Imported', category=self.category)
+        Expenses.objects.create(user=self.user, amount=5, description='Imported', category=self.category)
+        call_command('rebuild_rollups', stdout=StringIO())
+        rollup = DailyRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.total, rollup.count), (25, 2))
+
+
+class SummaryQueryBudgetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='budgetuser', password='testpass123')
+        self.category = Category.objects.create(name='Budget Category')
+        self.client.force_authenticate(user=self.user)
+        for amount, tags in [(100, 'work'), (40, 'family'), (10, 'work,family')]:
+            self.client.post(reverse('create_expense'), {
+                'amount': amount, 'description': 'Budget expense', 'category': self.category.id, 'tags': tags
+            }, format='json')
+
+    def test_summary_query_count(self):
+        url = reverse('expense_summary')
+        for query in ['', '?period=monthly', f'?category={self.category.id}', '?tags=work',
+                      '?date_from=2020-01-01&date_to=2099-12-31&tags=work,family']:
+            with self.assertNumQueries(2):
+                response = self.client.get(url + query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_summary_totals(self):
+        response = self.client.get(reverse('expense_summary') + '?tags=work')
+        self.assertEqual(response.data['summary']['total_amount'], 110)
+        self.assertEqual(response.data['summary']['total_count'], 2)
+        self.assertEqual(response.data['spending_insights']['current_month_spending'], 110)
+        self.assertEqual(response.data['spending_insights']['top_category_this_month'], 'Budget Category')
+
+
+class ExpenseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacheuser', password='testpass123')
+        self.category = Category.objects.create(name='Cache Category')
+        self.client.force_authenticate(user=self.user)
+
+    def create_expense(self, amount):
+        return self.client.post(reverse('create_expense'), {
+            'amount': amount, 'description': 'Cached expense', 'category': self.category.id
+        }, format='json')
+
+    def test_repeated_summary_is_served_from_cache(self):
+        self.create_expense(100)
+        url = reverse('expense_summary')
+        self.client.get(url + '?period=monthly')
+        # Only the watermark lookup used for the ETag
+        with self.assertNumQueries(1):
+            response = self.client.get(url + '?period=monthly')
+        self.assertEqual(response.data['summary']['total_amount'], 100)
+
+    def test_write_invalidates_cached_results(self):
+        self.create_expense(100)
+        self.assertEqual(self.client.get(reverse('expense_summary')).data['summary']['total_amount'], 100)
+        self.assertEqual(self.client.get(reverse('list_expenses')).data['count'], 1)
+        self.create_expense(50)
+        self.assertEqual(self.client.get(reverse('expense_summary')).data['summary']['total_amount'], 150)
+        self.assertEqual(self.client.get(reverse('list_expenses')).data['count'], 2)
+
+    def test_write_from_another_worker_invalidates_cached_results(self):
+        self.create_expense(100)
+        self.assertEqual(self.client.get(reverse('expense_summary')).data['budget_status']['monthly_budget'], 0)
+        # Another worker's write only reaches this one through the database
+        UserProfile.objects.filter(user=self.user).update(monthly_budget=500, updated_at=timezone.now())
+        self.assertEqual(self.client.get(reverse('expense_summary')).data['budget_status']['monthly_budget'], 500)
+
+    def test_cache_stats_requires_admin(self):
+        url = reverse('expense_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', response.data)
+        self.assertIn('misses', response.data)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cursoruser', password='testpass123')
+        self.category = Category.objects.create(name='Cursor Category')
+        self.client.force_authenticate(user=self.user)
+        self.ids = [
+            Expenses.objects.create(user=self.user, amount=i, description=f'Expense {i}', category=self.category).id
+            for i in range(7)
+        ]
+
+    def test_walks_all_pages_without_count(self):
+        url = reverse('list_expenses') + '?pagination=cursor&page_size=3'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            for query in queries.captured_queries:
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('SELECT 1 AS', query['sql'])
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(self.ids, reverse=True))
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.client.get(reverse('list_expenses') + '?pagination=cursor&page_size=3').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in first['results']])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('list_expenses') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExpenseTagTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='taguser', password='testpass123')
+        self.category = Category.objects.create(name='Tag Category')
+        self.client.force_authenticate(user=self.user)
+
+    def create_expense(self, amount, tags):
+        response = self.client.post(reverse('create_expense'), {
+            'amount': amount, 'description': 'Tagged expense', 'category': self.category.id, 'tags': tags
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_tags_are_normalized(self):
+        data = self.create_expense(10, ' Work, family ,work,')
+        names = ExpenseTag.objects.filter(expense_id=data['id']).values_list('tag__name', flat=True)
+        self.assertEqual(sorted(names), ['family', 'work'])
+
+    def test_filter_matches_whole_tags(self):
+        self.create_expense(10, 'work')
+        self.create_expense(20, 'homework')
+        self.create_expense(30, 'work,family')
+        response = self.client.get(reverse('list_expenses') + '?tags=work')
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(reverse('list_expenses') + '?tags=WORK,family')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_update_replaces_tags(self):
+        data = self.create_expense(10, 'work')
+        self.client.put(reverse('update_expense', args=[data['id']]), {
+            'amount': 10, 'description': 'Tagged expense', 'category': self.category.id, 'tags': 'travel'
+        }, format='json')
+        self.assertEqual(self.client.get(reverse('list_expenses') + '?tags=work').data,
+                         {'message': 'No expenses found.'})
+        self.assertEqual(self.client.get(reverse('list_expenses') + '?tags=travel').data['count'], 1)
+
+    def test_summary_tag_breakdown(self):
+        self.create_expense(10, 'work')
+        self.create_expense(30, 'work,family')
+        response = self.client.get(reverse('expense_summary'))
+        self.assertEqual(response.data['tag_breakdown'], [
+            {'name': 'work', 'total': 40, 'count': 2},
+            {'name': 'family', 'total': 30, 'count': 1},
+        ])
+
+
+class BulkCreateExpenseTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bulkuser', password='testpass123')
+        self.category = Category.objects.create(name='Bulk Category')
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_reports_row_errors(self):
+        rows = [
+            {'amount': 10, 'description': 'First', 'category': self.category.id, 'tags': 'work'},
+            {'amount': 'abc', 'description': 'Bad amount', 'category': self.category.id},
+            {'amount': 5, 'description': 'Bad category', 'category': 999},
+            {'amount': 20, 'description': 'Second', 'category': str(self.category.id)},
+        ]
+        response = self.client.post(reverse('bulk_create_expenses'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['description'] for row in response.data['created']], ['First', 'Second'])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('category', response.data['errors'][1]['error'])
+        self.assertEqual(Expenses.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(DailyRollup.objects.get(user=self.user).total, 30)
+        self.assertEqual(self.client.get(reverse('list_expenses') + '?tags=work').data['count'], 1)
+
+    def test_bulk_create_uses_one_category_lookup(self):
+        rows = [{'amount': i, 'description': f'Row {i}', 'category': self.category.id} for i in range(1, 51)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bulk_create_expenses'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        category_queries = [q for q in queries.captured_queries if 'FROM "categories_category"' in q['sql']]
+        self.assertEqual(len(category_queries), 1)
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(reverse('bulk_create_expenses'), {'amount': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportExpenseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exportuser', password='testpass123')
+        self.category = Category.objects.create(name='Export Category')
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('bulk_create_expenses'), [
+            {'amount': 10, 'description': 'Lunch, with team', 'category': self.category.id, 'tags': 'work'},
+            {'amount': 20, 'description': 'Cinema', 'category': self.category.id, 'tags': 'family'},
+        ], format='json')
+
+    def test_export_csv(self):
+        response = self.client.get(reverse('export_expenses'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'date', 'amount', 'category', 'description', 'tags', 'timestamp'])
+        self.assertEqual([row[4] for row in rows[1:]], ['Lunch, with team', 'Cinema'])
+        self.assertEqual(rows[1][2], '10.00')
+
+    def test_export_ndjson_honours_filters(self):
+        response = self.client.get(reverse('export_expenses') + '?output=ndjson&tags=family')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['description'], 'Cinema')
+
+    def test_export_unknown_output(self):
+        response = self.client.get(reverse('export_expenses') + '?output=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportExpenseTests(APITestCase):
+    csv_data = (
+        'Date,Amount,Description,Category,Tags\n'
+        '2024-01-15,12.50,Coffee,groceries,work\n'
+        '2024-01-16,abc,Broken amount,Groceries,\n'
+        '2024-13-01,5,Broken date,Groceries,\n'
+        '2024-01-17,7,Unknown category,Spaceships,\n'
+        '2024-02-01,"1,200.00",Rent,Bills,home\n'
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='importuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_import_upload_keeps_dates(self):
+        upload = SimpleUploadedFile('bank.csv', self.csv_data.encode(), content_type='text/csv')
+        response = self.client.post(reverse('import_expenses'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['rejected'], 3)
+        self.assertEqual(response.data['rejected_reasons'],
+                         {'invalid amount': 1, 'invalid date': 1, 'unknown category': 1})
+        dates = Expenses.objects.filter(user=self.user).order_by('date').values_list('date', flat=True)
+        self.assertEqual([d.isoformat() for d in dates], ['2024-01-15', '2024-02-01'])
+        self.assertEqual(DailyRollup.objects.filter(user=self.user).count(), 2)
+
+    def test_import_missing_columns(self):
+        upload = SimpleUploadedFile('bank.csv', b'date,amount\n2024-01-01,5\n', content_type='text/csv')
+        response = self.client.post(reverse('import_expenses'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.csv_data)
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('import_expenses', 'importuser', f.name, '--batch-size', '2', stdout=out)
+        self.assertEqual(Expenses.objects.filter(user=self.user).count(), 2)
+        self.assertIn('Rejected 3 rows', out.getvalue())
+
+    def test_create_expense_with_past_date(self):
+        response = self.client.post(reverse('create_expense'), {
+            'amount': 10, 'description': 'Backdated', 'category': Category.objects.first().id, 'date': '2023-05-01'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['date'], '2023-05-01')
+
+    def test_future_dates_are_rejected(self):
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        response = self.client.post(reverse('create_expense'), {
+            'amount': 10, 'description': 'Postdated', 'category': Category.objects.first().id, 'date': tomorrow
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('date', response.data['error'])
+
+        upload = SimpleUploadedFile('bank.csv', (
+            'date,amount,description,category\n'
+            f'{tomorrow},5,Postdated,Groceries\n'
+            '2024-01-15,5,Coffee,Groceries\n'
+        ).encode(), content_type='text/csv')
+        response = self.client.post(reverse('import_expenses'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['rejected_reasons'], {'future date': 1})
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='etaguser', password='testpass123')
+        self.category = Category.objects.create(name='ETag Category')
+        self.client.force_authenticate(user=self.user)
+        self.create_expense(10)
+
+    def create_expense(self, amount):
+        self.client.post(reverse('create_expense'), {
+            'amount': amount, 'description': 'Polled expense', 'category': self.category.id
+        }, format='json')
+
+    def test_matching_etag_returns_304(self):
+        for name in ['expense_summary', 'list_expenses']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.has_header('Last-Modified'))
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_filters(self):
+        etag = self.client.get(reverse('expense_summary'))['ETag']
+        response = self.client.get(reverse('expense_summary') + '?period=weekly', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get(reverse('expense_summary'))['ETag']
+        self.create_expense(20)
+        response = self.client.get(reverse('expense_summary'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_amount'], 30)
+
+    def test_budget_change_refreshes_summary(self):
+        self.client.get(reverse('expense_summary'))
+        self.client.put(reverse('budget'), {'monthly_budget': '500.00'}, format='json')
+        response = self.client.get(reverse('expense_summary'))
+        self.assertEqual(response.data['budget_status']['monthly_budget'], 500.0)
+
+
+class FastListSerializerTests(APITestCase):
+    def test_matches_model_serializer_json(self):
+        user = User.objects.create_user(username='fastuser', password='testpass123')
+        category = Category.objects.create(name='Fast Category')
+        Expenses.objects.create(user=user, amount='12.5', description='Lunch "team"', category=category, tags='work')
+        Expenses.objects.create(user=user, amount=3, description='Bus', category=category, date='2024-02-29')
+        expenses = Expenses.objects.filter(user=user).order_by('-date', '-id')
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(serialize_rows(read_queryset(expenses))),
+            renderer.render(ExpensesSerializer(expenses, many=True).data)
+        )
+
+    def test_list_page_has_no_per_row_queries(self):
+        user = User.objects.create_user(username='fastlistuser', password='testpass123')
+        category = Category.objects.create(name='Fast List Category')
+        for i in range(10):
+            Expenses.objects.create(user=user, amount=i, description=f'Row {i}', category=category)
+        cache.clear()
+        self.client.force_authenticate(user=user)
+        # watermark lookup, COUNT(*) and the page itself
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('list_expenses') + '?page_size=10')
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class SpendingStreakTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='streakuser', password='testpass123')
+        self.category = Category.objects.create(name='Streak Category')
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+
+    def add_days(self, offsets):
+        rows = [
+            {'amount': 5, 'description': f'Day {offset}', 'category': self.category.id,
+             'date': (self.today - timedelta(days=offset)).isoformat()}
+            for offset in offsets
+        ]
+        return self.client.post(reverse('bulk_create_expenses'), rows, format='json').data['created']
+
+    def insights(self):
+        return self.client.get(reverse('spending_insights')).data
+
+    def add_future_expense(self, days):
+        # Rows dated ahead of today can only come from before dates were validated
+        expense = Expenses.objects.create(user=self.user, amount=7, description='Postdated',
+                                          category=self.category, date=self.today + timedelta(days=days))
+        expenses_changed.send(sender=Expenses, user_id=self.user.id, added=[expense])
+
+    def test_weekly_spending_ignores_future_rows(self):
+        self.add_days([0, 1])
+        self.add_future_expense(3)
+        self.assertEqual(self.insights()['weekly_spending'], 10)
+
+    def test_current_streak_is_the_run_holding_today(self):
+        self.add_days([0, 1, 2])
+        # A separate, later run becomes the latest one
+        self.add_future_expense(3)
+        data = self.insights()
+        self.assertEqual(data['spending_streak_days'], 3)
+        self.assertEqual(data['longest_streak_days'], 3)
+
+    def test_long_streak_is_reported(self):
+        self.add_days(range(40))
+        data = self.insights()
+        self.assertEqual(data['spending_streak_days'], 40)
+        self.assertEqual(data['longest_streak_days'], 40)
+        self.assertEqual(data['last_spend_day'], self.today)
+
+    def test_delete_and_update_split_and_merge_runs(self):
+        created = self.add_days(range(40))
+        day_10 = next(expense for expense in created if expense['description'] == 'Day 10')
+        self.client.delete(reverse('delete_expense', args=[day_10['id']]))
+        data = self.insights()
+        self.assertEqual(data['spending_streak_days'], 10)
+        self.assertEqual(data['longest_streak_days'], 29)
+
+        # Moving today's expense into the gap joins the runs but breaks today
+        day_0 = next(expense for expense in created if expense['description'] == 'Day 0')
+        self.client.put(reverse('update_expense', args=[day_0['id']]), {
+            'amount': 5, 'description': 'Moved', 'category': self.category.id,
+            'date': (self.today - timedelta(days=10)).isoformat(),
+        }, format='json')
+        data = self.insights()
+        self.assertEqual(data['spending_streak_days'], 0)
+        self.assertEqual(data['longest_streak_days'], 39)
+        self.assertEqual(SpendingRun.objects.filter(user=self.user).count(), 1)
+
+    def test_second_expense_on_a_day_keeps_the_run(self):
+        created = self.add_days([0, 0, 1])
+        self.client.delete(reverse('delete_expense', args=[created[0]['id']]))
+        self.assertEqual(self.insights()['spending_streak_days'], 2)
+
+    def test_only_touching_runs_are_rebuilt(self):
+        self.add_days(range(100, 400))
+        old_run = SpendingRun.objects.get(user=self.user)
+        self.add_days([0, 1])
+        self.assertTrue(SpendingRun.objects.filter(pk=old_run.pk, days=300).exists())
+        data = self.insights()
+        self.assertEqual(data['spending_streak_days'], 2)
+        self.assertEqual(data['longest_streak_days'], 300)
+
+    def test_rebuild_matches_incremental_state(self):
+        self.add_days([0, 1, 2, 5, 6, 7, 8, 20])
+        before = SpendingStreak.objects.values().get(user=self.user)
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertEqual(SpendingStreak.objects.values().get(user=self.user), before)
+        self.assertEqual(before['longest'], 4)
+        self.assertEqual(SpendingRun.objects.filter(user=self.user).count(), 3)
+
+    def test_random_writes_match_rebuild(self):
+        rng = random.Random(7)
+        created = []
+        for _ in range(15):
+            if created and rng.random() < 0.4:
+                expense = created.pop(rng.randrange(len(created)))
+                self.client.delete(reverse('delete_expense', args=[expense['id']]))
+            else:
+                created += self.add_days(rng.sample(range(30), rng.randint(1, 6)))
+        runs = list(SpendingRun.objects.filter(user=self.user).order_by('start').values_list('start', 'end', 'days'))
+        streak = SpendingStreak.objects.values().get(user=self.user)
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(
+            list(SpendingRun.objects.filter(user=self.user).order_by('start').values_list('start', 'end', 'days')), runs
+        )
+        self.assertEqual(SpendingStreak.objects.values().get(user=self.user), streak)
+
+
+class TimeSeriesTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seriesuser', password='testpass123')
+        self.category = Category.objects.create(name='Series Category')
+        self.other_category = Category.objects.create(name='Other Series Category')
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+
+    def add(self, amount, offset, category=None, tags=''):
+        response = self.client.post(reverse('create_expense'), {
+            'amount': amount, 'description': 'Series expense', 'category': (category or self.category).id,
+            'date': (self.today - timedelta(days=offset)).isoformat(), 'tags': tags,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def series(self, query=''):
+        response = self.client.get(reverse('expense_timeseries') + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_daily_buckets_fill_gaps(self):
+        self.add(10, 0)
+        self.add(5, 0)
+        self.add(20, 3)
+        data = self.series()
+        self.assertEqual(len(data['buckets']), 30)
+        self.assertEqual(data['date_to'], self.today)
+        totals = {bucket['start']: (bucket['total'], bucket['count']) for bucket in data['buckets']}
+        self.assertEqual(totals[self.today], (15, 2))
+        self.assertEqual(totals[self.today - timedelta(days=3)], (20, 1))
+        self.assertEqual(totals[self.today - timedelta(days=1)], (0, 0))
+
+    def test_week_and_month_buckets(self):
+        month_start = self.today.replace(day=1)
+        self.add(10, (self.today - month_start).days)
+        self.add(7, (self.today - month_start).days + 1)
+        data = self.series('?interval=month&date_from=' + (month_start - timedelta(days=1)).isoformat())
+        self.assertEqual([bucket['start'] for bucket in data['buckets']],
+                         [(month_start - timedelta(days=1)).replace(day=1), month_start])
+        self.assertEqual([bucket['total'] for bucket in data['buckets']], [7, 10])
+
+        data = self.series('?interval=week')
+        self.assertEqual(len(data['buckets']), 12)
+        self.assertTrue(all(bucket['start'].weekday() == 0 for bucket in data['buckets']))
+        self.assertEqual(sum(bucket['total'] for bucket in data['buckets']), 17)
+
+    def test_split_by_category_and_filters(self):
+        self.add(10, 1, tags='work')
+        self.add(30, 1, self.other_category)
+        bucket = self.series('?split=category')['buckets'][-2]
+        self.assertEqual(bucket['categories'], [
+            {'id': self.other_category.id, 'name': 'Other Series Category', 'total': 30, 'count': 1},
+            {'id': self.category.id, 'name': 'Series Category', 'total': 10, 'count': 1},
+        ])
+        self.assertEqual(self.series(f'?category={self.category.id}')['buckets'][-2]['total'], 10)
+        self.assertEqual(self.series('?tags=work')['buckets'][-2]['total'], 10)
+
+    def test_invalid_interval(self):
+        response = self.client.get(reverse('expense_timeseries') + '?interval=hour')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_closed_buckets_are_cached_until_a_backdated_write(self):
+        self.add(10, 2)
+        first = self.series()['date_from']
+        watermark = UserProfile.objects.get(user=self.user).closed_buckets_modified_at
+        self.assertIsNotNone(watermark)
+
+        # A write dated today leaves the closed buckets cached; only the open one is recomputed
+        self.add(5, 0)
+        self.assertEqual(UserProfile.objects.get(user=self.user).closed_buckets_modified_at, watermark)
+        with CaptureQueriesContext(connection) as captured:
+            data = self.series()
+        grouped = [q['sql'] for q in captured.captured_queries if 'GROUP BY' in q['sql']]
+        self.assertEqual(len(grouped), 1)
+        self.assertNotIn(first.isoformat(), grouped[0])
+        self.assertEqual([data['buckets'][-3]['total'], data['buckets'][-1]['total']], [10, 5])
+
+        # A backdated write moves the closed buckets' watermark, which every worker reads
+        self.add(7, 2)
+        self.assertEqual(self.series()['buckets'][-3]['total'], 17)
+
+
+class MonthlyStatementTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Statement Category')
+        self.month = (timezone.now().date().replace(day=1) - timedelta(days=1)).replace(day=1)
+        self.users = [User.objects.create_user(username=f'statementuser{i}', password='testpass123') for i in range(3)]
+        for i, user in enumerate(self.users):
+            self.client.force_authenticate(user=user)
+            for amount, day in [(10 * (i + 1), self.month), (5, self.month - timedelta(days=1))]:
+                self.client.post(reverse('create_expense'), {
+                    'amount': amount, 'description': 'Statement expense', 'category': self.category.id,
+                    'date': day.isoformat(), 'tags': 'work',
+                }, format='json')
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command('generate_statements', '--workers', '1', '--chunk-size', '2', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_statements_match_the_month(self):
+        self.assertIn('wrote 3 statements', self.generate())
+        data = MonthlyStatement.objects.get(user=self.users[1], month=self.month).data
+        self.assertEqual(data['summary']['total_count'], 1)
+        self.assertEqual(data['budget_status']['spent'], 20.0)
+        self.assertEqual(data['spending_insights']['last_month_spending'], '5')
+        self.assertEqual(data['category_breakdown'][0]['name'], 'Statement Category')
+        self.assertEqual(data['tag_breakdown'], [{'name': 'work', 'total': '20', 'count': 1}])
+
+    def test_rerun_resumes_and_force_regenerates(self):
+        self.generate()
+        MonthlyStatement.objects.filter(user=self.users[0]).delete()
+        self.assertIn('wrote 1 statements (2 already done)', self.generate())
+        self.assertIn('wrote 3 statements', self.generate('--force'))
+        self.assertEqual(MonthlyStatement.objects.count(), 3)
+
+
+class MonthSpendTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='monthuser', password='testpass123')
+        self.category = Category.objects.create(name='Month Category')
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+        self.last_month = self.today.replace(day=1) - timedelta(days=1)
+        self.client.put(reverse('budget'), {'monthly_budget': '100.00'}, format='json')
+
+    def add(self, amount, day):
+        response = self.client.post(reverse('create_expense'), {
+            'amount': amount, 'description': 'Month expense', 'category': self.category.id, 'date': day.isoformat(),
+        }, format='json')
+        return response.data['id']
+
+    def profile(self):
+        profile = UserProfile.objects.get(user=self.user)
+        return profile.month_start, profile.month_spent, profile.month_count
+
+    def test_writes_keep_month_spend(self):
+        first = self.add(30, self.today)
+        self.add(20, self.today)
+        self.add(500, self.last_month)
+        self.assertEqual(self.profile(), (self.today.replace(day=1), 50, 2))
+
+        self.client.put(reverse('update_expense', args=[first]), {
+            'amount': 30, 'description': 'Moved', 'category': self.category.id, 'date': self.last_month.isoformat(),
+        }, format='json')
+        self.assertEqual(self.profile()[1:], (20, 1))
+
+        response = self.client.get(reverse('budget'))
+        self.assertEqual((response.data['spent'], response.data['count'], response.data['remaining']), (20, 1, 80))
+        # All-time spend is 550; the budget is compared with this month only
+        response = self.client.get(reverse('expense_summary'))
+        self.assertEqual(response.data['summary']['total_amount'], 550)
+        self.assertEqual(response.data['budget_status']['spent'], 20.0)
+        self.assertEqual(response.data['budget_status']['percentage_used'], 20.0)
+
+    def test_stale_month_rolls_over_on_read(self):
+        self.add(40, self.today)
+        UserProfile.objects.filter(user=self.user).update(month_start=self.last_month.replace(day=1), month_spent=999)
+        self.assertEqual(self.client.get(reverse('budget')).data['spent'], 40)
+        self.assertEqual(self.profile(), (self.today.replace(day=1), 40, 1))
+
+    def test_reconcile_fixes_drift(self):
+        self.add(40, self.today)
+        UserProfile.objects.filter(user=self.user).update(month_spent=1, month_count=7)
+        out = StringIO()
+        call_command('reconcile_month_spend', stdout=out)
+        self.assertIn('fixed 1', out.getvalue())
+        self.assertEqual(self.profile()[1:], (40, 1))
+
+
+class ExpenseSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='searchuser', password='testpass123')
+        self.other = User.objects.create_user(username='othersearchuser', password='testpass123')
+        self.category = Category.objects.create(name='Search Category')
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, description, days_ago=0, user=None):
+        return Expenses.objects.create(user=user or self.user, amount=10, description=description,
+                                       category=self.category, date=timezone.now().date() - timedelta(days=days_ago))
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('list_expenses'), {'search': query, 'page_size': 20, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['description'] for row in response.data.get('results', [])]
+
+    def test_ranked_word_and_prefix_matches(self):
+        self.add('Monthly rent for the flat, paid late', days_ago=0)
+        self.add('Rent', days_ago=30)
+        self.add('Uber to the airport')
+        self.add('Rent', user=self.other)
+        # The better match comes first even though it is older
+        self.assertEqual(self.search('rent'), ['Rent', 'Monthly rent for the flat, paid late'])
+        self.assertEqual(self.search('ub'), ['Uber to the airport'])
+        self.assertEqual(self.search('uber airport'), ['Uber to the airport'])
+        self.assertEqual(self.client.get(reverse('list_expenses'), {'search': 'taxi'}).data,
+                         {'message': 'No expenses found.'})
+
+    def test_index_follows_writes(self):
+        expense = self.add('Coffee beans')
+        Expenses.objects.bulk_create([
+            Expenses(user=self.user, amount=3, description=f'Espresso {i}', category=self.category) for i in range(3)
+        ])
+        self.assertEqual(len(self.search('espresso')), 3)
+
+        self.client.put(reverse('update_expense', args=[expense.id]), {
+            'amount': 10, 'description': 'Green tea', 'category': self.category.id,
+        }, format='json')
+        self.assertEqual(self.search('coffee'), [])
+        self.assertEqual(self.search('tea'), ['Green tea'])
+        self.client.delete(reverse('delete_expense', args=[expense.id]))
+        self.assertEqual(self.search('tea'), [])
+
+    def test_search_applies_to_summary_and_pages(self):
+        for i in range(7):
+            self.add(f'Groceries run {i}')
+        self.add('Cinema')
+        response = self.client.get(reverse('expense_summary'), {'search': 'groceries'})
+        self.assertEqual(response.data['summary']['total_count'], 7)
+        response = self.client.get(reverse('list_expenses'), {'search': 'groceries', 'page_size': 5, 'page': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class BenchmarkApiCommandTests(APITestCase):
+    def test_reports_every_endpoint(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('benchmark_api', users=2, expenses_per_user=5, requests=2,
+                         use_existing_db=True, output=output.name, stderr=StringIO())
+            report = json.load(open(output.name))
+        self.assertEqual(report['requests_per_endpoint'], 2)
+        for name in ['list_expenses', 'expense_summary', 'category-list', 'login']:
+            endpoint = report['endpoints'][name]
+            self.assertEqual(endpoint['requests'], 2)
+            self.assertIn('p99_ms', endpoint)
+            self.assertIn('queries_per_request', endpoint)
+        statuses = {code for endpoint in report['endpoints'].values() for code in endpoint['status_codes']}
+        self.assertFalse({code for code in statuses if code.startswith(('4', '5'))})
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from django.apps import apps
+from django.db import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from expense_tracker import health
+
+
+class HealthTests(TestCase):
+    def setUp(self):
+        health._schema_ready = False
+
+    def test_live_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health-live'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_ready(self):
+        response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        # The schema is only checked until it has been seen up to date
+        with mock.patch('expense_tracker.health.pending_migrations') as pending:
+            self.client.get(reverse('health-ready'))
+        pending.assert_not_called()
+
+    def test_pending_migrations(self):
+        with mock.patch('expense_tracker.health.pending_migrations', return_value=['expenses.9999_next']):
+            response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['pending'], ['expenses.9999_next'])
+
+    def test_database_unavailable(self):
+        with mock.patch('expense_tracker.health.pending_migrations', side_effect=OperationalError('down')):
+            response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Database unavailable', response.json()['error'])
+
+    def test_app_ready_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            apps.get_app_config('authentication').ready()
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.models import User
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from apps.categories.models import Category
+from apps.expenses.models import Expenses
+from expense_tracker import metrics
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir.name, METRICS_TOKEN='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='metricsuser', password='testpass123', is_staff=True)
+        category = Category.objects.create(name='Metrics Category')
+        Expenses.objects.create(user=self.user, amount=10, description='Lunch', category=category)
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('list_expenses'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('view;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    async def test_async_views_count_their_queries(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        for name in ['async_list_expenses', 'list_expenses']:
+            response = await AsyncClient().get(reverse(name), headers=headers)
+            queries = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+            self.assertGreater(queries, 0, name)
+
+    def test_histograms_per_url_name(self):
+        self.client.get(reverse('list_expenses'))
+        self.client.get(reverse('expense_summary'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_db_queries_bucket{view="list_expenses",method="GET",le="+Inf"}', body)
+        self.assertIn('http_response_size_bytes_count{view="expense_summary",method="GET"}', body)
+        self.assertIn('http_requests_total{view="list_expenses",method="GET",status="200"}', body)
+
+    def test_merges_worker_files(self):
+        self.client.get(reverse('metrics'))
+        before = metrics.collect()[1].get(('list_expenses', 'GET', '200'), 0)
+        buckets = len(metrics.HISTOGRAMS['http_db_queries'][1])
+        # Another worker of this process's age, alive as far as collect() can tell
+        with open(os.path.join(self.metrics_dir.name, f'{os.getpid()}-other.json'), 'w') as f:
+            json.dump({
+                'histograms': [['http_db_queries', 'list_expenses', 'GET', [1] * buckets + [1, 3]]],
+                'requests': [['list_expenses', 'GET', '200', 7]],
+            }, f)
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(f'http_requests_total{{view="list_expenses",method="GET",status="200"}} {before + 7}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_requires_staff_without_token(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='plainuser', password='testpass123'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+    def test_files_of_exited_workers_are_removed(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        path = os.path.join(self.metrics_dir.name, f'{exited.pid}-1.json')
+        with open(path, 'w') as f:
+            json.dump({'histograms': [], 'requests': [['list_expenses', 'GET', '200', 7]]}, f)
+        metrics.collect()
+        self.assertFalse(os.path.exists(path))
+
+    def test_streamed_response_size_is_recorded(self):
+        key = ('http_response_size_bytes', 'export_expenses', 'GET')
+        metrics.flush()
+        before = metrics.collect()[0].get(key, [0, 0])
+        response = self.client.get(reverse('export_expenses'))
+        size = len(b''.join(response.streaming_content))
+        metrics.flush()
+        after = metrics.collect()[0][key]
+        self.assertEqual(after[-2] - before[-2], 1)
+        self.assertEqual(after[-1] - before[-1], size)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import mock
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.authentication import provisioning
+from apps.authentication.models import UserProfile
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='provisionadmin', password='testpass123', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+
+    def rows(self, prefix, count):
+        return [{'username': f'{prefix}{n}', 'email': f'{prefix}{n}@example.com', 'password': f'secret-{n}'}
+                for n in range(count)]
+
+    def test_creates_users_with_profiles(self):
+        rows = self.rows('new', 2) + [
+            {'username': 'provisionadmin', 'email': 'a@example.com', 'password': 'x'},
+            {'username': 'new0', 'email': 'b@example.com', 'password': 'x'},
+            {'username': 'bad name!', 'email': 'c@example.com', 'password': 'x'},
+        ]
+        response = self.client.post(reverse('bulk_provision_users'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['rejected_reasons'], {
+            'username already exists': 1, 'duplicate username': 1, 'invalid username': 1,
+        })
+        self.assertEqual(sorted(error['index'] for error in response.data['errors']), [2, 3, 4])
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='new').count(), 2)
+        self.assertIsNotNone(authenticate(username='new1', password='secret-1'))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        counts = []
+        for prefix, count in [('small', 2), ('large', 40)]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('bulk_provision_users'), self.rows(prefix, count), format='json')
+            self.assertEqual(response.data['created'], count)
+            counts.append(len([q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='plainuser', password='testpass123'))
+        response = self.client.post(reverse('bulk_provision_users'), self.rows('new', 1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_endpoint_hashes_on_threads(self):
+        rows = self.rows('threaded', provisioning.POOL_THRESHOLD + 6)
+        with mock.patch.object(provisioning, 'ProcessPoolExecutor', side_effect=AssertionError('no processes')):
+            response = self.client.post(reverse('bulk_provision_users'), rows, format='json')
+        self.assertEqual(response.data['created'], len(rows))
+
+    def test_batch_that_keeps_colliding_is_rejected(self):
+        User.objects.create_user(username='raced', password='x')
+        rows = self.rows('fine', 2) + [{'username': 'raced', 'email': 'r@example.com', 'password': 'x'}]
+        # The existing username is missed by both checks, as with a concurrent signup
+        with mock.patch.object(provisioning, 'taken_usernames', return_value=set()):
+            response = self.client.post(reverse('bulk_provision_users'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['rejected_reasons'], {'could not be created': 3})
+        self.assertFalse(User.objects.filter(username__startswith='fine').exists())
+
+    def test_command_hashes_in_a_process_pool(self):
+        count = provisioning.POOL_THRESHOLD + 6
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.csv')
+            with open(path, 'w') as f:
+                f.write('Username,Email,Password\n')
+                f.writelines(f"{row['username']},{row['email']},{row['password']}\n" for row in self.rows('csv', count))
+            call_command('provision_users', path, '--workers', '2', '--batch-size', '100', stdout=open(os.devnull, 'w'))
+        self.assertEqual(User.objects.filter(username__startswith='csv', userprofile__isnull=False).count(), count)
+        self.assertIsNotNone(authenticate(username=f'csv{count - 1}', password=f'secret-{count - 1}'))
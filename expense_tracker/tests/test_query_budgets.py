@@ -0,0 +1,121 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.authentication.models import UserProfile
+from apps.categories.models import Category
+from apps.expenses.models import Expenses
+from apps.expenses.signals import expenses_changed
+from .query_budget import QueryBudgetMixin, normalize_sql
+
+# Maximum queries per request, with a cold cache
+BUDGETS = {
+    'list_expenses': 3,
+    'list_expenses_cursor': 2,
+    'expense_summary': 2,
+    'spending_insights': 3,
+    'expense_timeseries': 3,
+    'export_expenses': 1,
+    'category-list': 1,
+    'create_expense': 10,
+    'create_expense_untagged': 6,
+    'bulk_create_expenses': 9,
+    'budget': 1,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.categories = [Category.objects.create(name=f'Budget Category {i}') for i in range(5)]
+        self.users = 0
+
+    def seed_user(self, rows):
+        # A fresh user with ``rows`` expenses spread over categories, days and tags
+        self.users += 1
+        user = User.objects.create_user(username=f'budgetuser{self.users}', password='testpass123')
+        UserProfile.objects.filter(user=user).update(monthly_budget=Decimal('1000.00'))
+        today = timezone.localdate()
+        expenses = Expenses.objects.bulk_create([
+            Expenses(user=user, amount=Decimal(i % 97) + Decimal('0.25'), description=f'Expense {i}',
+                     category=self.categories[i % len(self.categories)], tags=['work', 'home,food', ''][i % 3],
+                     date=today - timedelta(days=i % 60))
+            for i in range(rows)
+        ])
+        expenses_changed.send(sender=Expenses, user_id=user.id, added=expenses)
+        self.client.force_authenticate(user=user)
+        return user
+
+    def test_read_endpoints_within_budget(self):
+        self.seed_user(500)
+        self.assertQueryBudget(BUDGETS['list_expenses'], 'get', reverse('list_expenses'), {'page_size': 50})
+        self.assertQueryBudget(BUDGETS['list_expenses_cursor'], 'get', reverse('list_expenses'),
+                               {'page_size': 50, 'pagination': 'cursor'})
+        self.assertQueryBudget(BUDGETS['expense_summary'], 'get', reverse('expense_summary'))
+        self.assertQueryBudget(BUDGETS['spending_insights'], 'get', reverse('spending_insights'))
+        self.assertQueryBudget(BUDGETS['expense_timeseries'], 'get', reverse('expense_timeseries'),
+                               {'interval': 'week', 'split': 'category'})
+        self.assertQueryBudget(BUDGETS['export_expenses'], 'get', reverse('export_expenses'))
+        self.assertQueryBudget(BUDGETS['category-list'], 'get', reverse('category-list'))
+        self.assertQueryBudget(BUDGETS['budget'], 'get', reverse('budget'))
+
+    def test_write_endpoints_within_budget(self):
+        self.seed_user(500)
+        data = {'amount': '12.50', 'description': 'Lunch', 'category': self.categories[0].id, 'tags': 'work'}
+        self.assertQueryBudget(BUDGETS['create_expense'], 'post', reverse('create_expense'), data)
+        # A second expense on the same day, without tags, skips the streak and tag work
+        self.assertQueryBudget(BUDGETS['create_expense_untagged'], 'post', reverse('create_expense'),
+                               {**data, 'tags': ''})
+        self.assertQueryBudget(BUDGETS['bulk_create_expenses'], 'post', reverse('bulk_create_expenses'),
+                               json.dumps([data] * 50), content_type='application/json')
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.seed_user(100)
+        self.assertNoNPlusOne(
+            lambda rows: ('get', reverse('list_expenses'), {'page_size': rows}, {}),
+            lambda rows: None,
+        )
+        self.assertNoNPlusOne(
+            lambda rows: ('get', reverse('list_expenses'), {'page_size': rows, 'pagination': 'cursor'}, {}),
+            lambda rows: None,
+        )
+
+    def test_read_queries_do_not_grow_with_rows(self):
+        for name in ['expense_summary', 'spending_insights', 'expense_timeseries', 'export_expenses']:
+            self.assertNoNPlusOne(lambda rows: ('get', reverse(name), None, {}), self.seed_user, small=5, large=200)
+
+    def test_bulk_create_queries_do_not_grow_with_rows(self):
+        self.seed_user(10)
+        data = {'amount': '3.00', 'description': 'Coffee', 'category': self.categories[0].id, 'tags': 'food'}
+        self.assertNoNPlusOne(
+            lambda rows: ('post', reverse('bulk_create_expenses'), json.dumps([data] * rows),
+                          {'content_type': 'application/json'}),
+            lambda rows: None,
+        )
+
+    def test_rollup_writes_do_not_grow_with_days_and_categories(self):
+        # Every row lands on its own (day, category) pair, before the seeded history
+        self.seed_user(10)
+        first_day = timezone.localdate() - timedelta(days=400)
+
+        def rows(count):
+            return json.dumps([
+                {'amount': '3.00', 'description': 'Coffee', 'category': self.categories[i % len(self.categories)].id,
+                 'date': (first_day - timedelta(days=count + i)).isoformat(), 'tags': 'food'}
+                for i in range(count)
+            ])
+
+        self.assertNoNPlusOne(
+            lambda count: ('post', reverse('bulk_create_expenses'), rows(count), {'content_type': 'application/json'}),
+            lambda count: None,
+        )
+
+    def test_normalize_sql_groups_repeated_statements(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND x IN (%s, %s, %s)"),
+            normalize_sql("SELECT * FROM t WHERE id = 7 AND name = 'b' AND x IN (%s)"),
+        )
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from unittest import mock
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.throttling import UserRateThrottle
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.categories.models import Category
+from apps.expenses.throttling import ExpenseRateThrottle, SQLiteBucketStore, SummaryRateThrottle
+
+
+class BucketStoreTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'throttle.sqlite3')
+
+    def test_bucket_empties_and_refills(self):
+        store = SQLiteBucketStore(self.path)
+        self.assertEqual([store.take('k', 3, 1.0, now=100)[0] for _ in range(4)], [True, True, True, False])
+        allowed, wait = store.take('k', 3, 1.0, now=100.25)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.75)
+        self.assertTrue(store.take('k', 3, 1.0, now=101.25)[0])
+        # Refills never exceed the capacity
+        self.assertEqual([store.take('k', 3, 1.0, now=1000)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_state_is_shared_between_stores(self):
+        # Two stores on one file behave like two workers
+        first, second = SQLiteBucketStore(self.path), SQLiteBucketStore(self.path)
+        self.assertTrue(first.take('k', 2, 0.001, now=0)[0])
+        self.assertTrue(second.take('k', 2, 0.001, now=0)[0])
+        self.assertFalse(first.take('k', 2, 0.001, now=0)[0])
+        self.assertTrue(second.take('other', 2, 0.001, now=0)[0])
+
+
+class ScopedThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(THROTTLE_STORE_PATH=os.path.join(self.directory.name, 'throttle.sqlite3'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='throttleuser', password='testpass123')
+        self.category = Category.objects.create(name='Throttle Category')
+        self.client.force_authenticate(user=self.user)
+
+    def create(self):
+        return self.client.post(reverse('create_expense'), {
+            'amount': 5, 'description': 'Throttled', 'category': self.category.id,
+        }, format='json')
+
+    @mock.patch.object(ExpenseRateThrottle, 'THROTTLE_RATES', {'expense': '2/hour'})
+    def test_expense_writes_are_limited(self):
+        self.assertEqual([self.create().status_code for _ in range(2)], [201, 201])
+        response = self.create()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Reads are not in the expense scope
+        self.assertEqual(self.client.get(reverse('list_expenses')).status_code, status.HTTP_200_OK)
+
+    @mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', {'user': '1/hour'})
+    def test_scoped_endpoints_skip_the_general_limit(self):
+        self.assertEqual([self.create().status_code for _ in range(2)], [201, 201])
+        self.assertEqual([self.client.get(reverse('expense_summary')).status_code for _ in range(2)], [200, 200])
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual([self.client.get(reverse('async_expense_summary')).status_code for _ in range(2)], [200, 200])
+
+    @mock.patch.object(SummaryRateThrottle, 'THROTTLE_RATES', {'summary': '1/hour'})
+    def test_summary_is_limited(self):
+        self.assertEqual(self.client.get(reverse('expense_summary')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('expense_summary')).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @mock.patch.object(SummaryRateThrottle, 'THROTTLE_RATES', {'summary': '1/hour'})
+    async def test_async_summary_shares_the_bucket(self):
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        response = await client.get(reverse('expense_summary'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await client.get(reverse('async_expense_summary'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
@@ -18,6 +18,9 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 
+from . import health
+from .metrics import metrics_view
+
 def api_root(request):
     return JsonResponse({
         'message': 'Expense Tracker API',
@@ -25,6 +28,7 @@ def api_root(request):
             'auth': '/api/auth/',
             'categories': '/api/categories/',
             'expenses': '/api/expenses/',
+            'async_expenses': '/api/async/expenses/',
             'admin': '/admin/'
         }
     })
@@ -32,7 +36,11 @@ def api_root(request):
 urlpatterns = [
     path('', api_root, name='api-root'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('health/live/', health.live, name='health-live'),
+    path('health/ready/', health.ready, name='health-ready'),
     path('api/auth/', include('apps.authentication.urls')),
     path('api/categories/', include('apps.categories.urls')),
     path('api/expenses/', include('apps.expenses.urls')),
+    path('api/async/expenses/', include('apps.expenses.async_urls')),
 ]